@@ -0,0 +1,118 @@
+"""Процессорное время на запрос: JSON API против HTML-страниц.
+
+Во временной базе создаются авторы, группа, записи и подписки, затем
+каждая лента запрашивается тестовым клиентом через API и как HTML.
+Перед каждым запросом временный кэш очищается, чтобы мерить выборку и
+сериализацию, а не попадание во фрагментный кэш. Печатается медиана
+process_time на запрос и размер ответа.
+
+Запуск: python benchmarks/api_vs_html.py [--posts 2000] [--repeat 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (setup_test_environment,  # noqa: E402
+                               teardown_test_environment)
+from django.urls import reverse  # noqa: E402
+
+from posts import feeds, lookups  # noqa: E402
+from posts.models import Comment, Follow, Group, Post  # noqa: E402
+from yatube.testing import isolated_cache  # noqa: E402
+
+
+def populate(posts):
+    User = get_user_model()
+    authors = [User.objects.create(username=f'author{number}')
+               for number in range(10)]
+    reader = User.objects.create(username='reader')
+    group = Group.objects.create(title='Группа', slug='group',
+                                 description='Описание')
+    Post.objects.bulk_create(
+        Post(text=f'Запись номер {number} ' * 10,
+             author=authors[number % len(authors)],
+             group=group if number % 2 else None)
+        for number in range(posts)
+    )
+    post = Post.objects.filter(author=authors[0]).first()
+    Comment.objects.bulk_create(
+        Comment(post=post, author=reader, text=f'Комментарий {number}')
+        for number in range(20)
+    )
+    for author in authors:
+        Follow.objects.create(user=reader, author=author)
+    feeds.rebuild_all()
+    return reader, post
+
+
+def measure(client, url, repeat):
+    times = []
+    size = 0
+    for _ in range(repeat):
+        cache.clear()
+        lookups.clear_local()
+        started = time.process_time()
+        response = client.get(url)
+        times.append(time.process_time() - started)
+        assert response.status_code == 200, (url, response.status_code)
+        size = len(response.content)
+    return statistics.median(times) * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with isolated_cache():
+            reader, post = populate(args.posts)
+            guest = Client()
+            member = Client()
+            member.force_login(reader)
+            pages = [
+                ('index', guest, reverse('index'), reverse('api:index')),
+                ('group', guest,
+                 reverse('group_posts', kwargs={'slug': 'group'}),
+                 reverse('api:group_posts', kwargs={'slug': 'group'})),
+                ('profile', guest,
+                 reverse('profile', kwargs={'username': 'author0'}),
+                 reverse('api:profile', kwargs={'username': 'author0'})),
+                ('post', guest,
+                 reverse('post', kwargs={'username': 'author0',
+                                         'post_id': post.pk}),
+                 reverse('api:post', kwargs={'username': 'author0',
+                                             'post_id': post.pk})),
+                ('follow', member, reverse('follow_index'),
+                 reverse('api:follow')),
+            ]
+            print(f'{"лента":<8} {"HTML, мс":>9} {"API, мс":>8} '
+                  f'{"HTML, байт":>11} {"API, байт":>10}')
+            for name, client, html_url, api_url in pages:
+                html_time, html_size = measure(client, html_url, args.repeat)
+                api_time, api_size = measure(client, api_url, args.repeat)
+                print(f'{name:<8} {html_time:>9.2f} {api_time:>8.2f} '
+                      f'{html_size:>11} {api_size:>10}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Сравнение SQLiteCache и LocMemCache при 1, 4 и 16 процессах.
+
+Каждый процесс делает одинаковое число обращений к ключам с
+распределением Ципфа и при промахе "вычисляет" значение и записывает его
+в кэш, как это делают страницы сайта. Для каждого бэкенда печатаются
+доля попаданий и число операций в секунду на все процессы.
+
+Запуск: python benchmarks/cache_backends.py [--operations 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache.backends.locmem import LocMemCache  # noqa: E402
+
+from yatube.cache import SQLiteCache  # noqa: E402
+
+KEYS = 5000
+VALUE = 'x' * 2000
+
+
+def make_cache(backend, location):
+    if backend == 'locmem':
+        return LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': KEYS * 2}})
+    return SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': KEYS * 2}})
+
+
+def worker(backend, location, operations, seed, results):
+    cache = make_cache(backend, location)
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(KEYS)]
+    keys = rnd.choices(range(KEYS), weights, k=operations)
+    hits = 0
+    for number, key in enumerate(keys, 1):
+        key = f'key:{key}'
+        if cache.get(key) is None:
+            cache.set(key, VALUE, 300)
+        else:
+            hits += 1
+        if number % 50 == 0:
+            cache.get_many([f'key:{i}' for i in range(20)])
+            cache.add('counter', 0)
+            cache.incr('counter')
+    results.put(hits)
+
+
+def run(backend, processes, operations, location):
+    context = get_context('fork')
+    results = context.Queue()
+    make_cache(backend, location).clear()
+    workers = [
+        context.Process(
+            target=worker,
+            args=(backend, location, operations, seed, results),
+        )
+        for seed in range(processes)
+    ]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    hits = sum(results.get() for _ in workers)
+    elapsed = time.perf_counter() - started
+    for process in workers:
+        process.join()
+    return hits / (operations * processes), operations * processes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--operations', type=int, default=20000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, 'cache.sqlite3')
+        print(f'{"backend":<8} {"procs":>5} {"hit rate":>9} {"ops/s":>10}')
+        for processes in (1, 4, 16):
+            for backend in ('locmem', 'sqlite'):
+                hit_rate, rate = run(
+                    backend, processes, args.operations, location
+                )
+                print(
+                    f'{backend:<8} {processes:>5} '
+                    f'{hit_rate:>9.1%} {rate:>10.0f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
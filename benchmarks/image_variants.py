@@ -0,0 +1,103 @@
+"""Сколько байт на страницу экономят варианты картинок WebP + srcset.
+
+Для каждой картинки выборки строятся те же варианты, что и в
+posts.thumbnails.GEOMETRIES (обрезка по центру, те же качества), и
+считается вес страницы из 10 карточек: раньше все устройства получали
+JPEG 960 px, теперь браузер берёт самый узкий вариант не уже нужного.
+
+Без --images используется синтетическая выборка, похожая на фотографии.
+
+Запуск: python benchmarks/image_variants.py [--images DIR] [--count 20]
+"""
+import argparse
+import os
+import random
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from PIL import Image, ImageOps  # noqa: E402
+from sorl.thumbnail.conf import settings as sorl_settings  # noqa: E402
+
+from posts import thumbnails  # noqa: E402
+
+PAGE_SIZE = 10
+# Ширина картинки карточки в физических пикселях на разных экранах
+DEVICES = {
+    'телефон (360 px, x2)': 720,
+    'планшет (768 px, x1)': 768,
+    'ноутбук (1366 px, x1)': 960,
+}
+
+
+def sample_images(directory, count):
+    if directory:
+        names = sorted(os.listdir(directory))[:count]
+        for name in names:
+            yield Image.open(os.path.join(directory, name)).convert('RGB')
+        return
+    rnd = random.Random(0)
+    for _ in range(count):
+        # Крупные цветные пятна плюс мелкий шум, как у фотографии
+        channels = [
+            Image.effect_noise((32, 18), rnd.randint(40, 90)).resize(
+                (1920, 1080), Image.BICUBIC
+            )
+            for _ in range(3)
+        ]
+        image = Image.merge('RGB', channels)
+        grain = Image.effect_noise((1920, 1080), 12).convert('RGB')
+        yield Image.blend(image, grain, 0.15)
+
+
+def encoded_size(image, size, options):
+    width, height = (int(value) for value in size.split('x'))
+    resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    buffer = BytesIO()
+    image_format = options.get('format', sorl_settings.THUMBNAIL_FORMAT)
+    quality = options.get('quality', sorl_settings.THUMBNAIL_QUALITY)
+    resized.save(buffer, image_format, quality=quality)
+    return buffer.tell()
+
+
+def chosen(needed, image_format):
+    for width in thumbnails.CARD_WIDTHS:
+        if width >= needed:
+            break
+    return f'card-{width}-{image_format}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images')
+    parser.add_argument('--count', type=int, default=20)
+    args = parser.parse_args()
+    sizes = {name: 0 for name in thumbnails.GEOMETRIES}
+    total = 0
+    for image in sample_images(args.images, args.count):
+        total += 1
+        for name, (size, options) in thumbnails.GEOMETRIES.items():
+            sizes[name] += encoded_size(image, size, options)
+    per_page = {
+        name: value / total * PAGE_SIZE for name, value in sizes.items()
+    }
+    before = per_page[thumbnails.CARD]
+    print(f'Картинок в выборке: {total}; страница: {PAGE_SIZE} карточек')
+    print(f'Раньше на любом устройстве: {before / 1024:.0f} КБ')
+    for device, needed in DEVICES.items():
+        for image_format in thumbnails.CARD_FORMATS:
+            after = per_page[chosen(needed, image_format)]
+            print(
+                f'{device}, {image_format}: {after / 1024:.0f} КБ, '
+                f'экономия {1 - after / before:.0%}'
+            )
+
+
+if __name__ == '__main__':
+    main()
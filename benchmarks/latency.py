@@ -0,0 +1,351 @@
+"""Сквозная задержка всех страниц posts и about (и JSON API).
+
+По умолчанию создаётся временная база и заполняется командой
+generate_data с фиксированным seed, поэтому прогоны на разных коммитах
+сравнимы. С --existing берётся текущая база (например, заполненная
+generate_data вручную); follow/unfollow и комментарии в ней меняются.
+
+Параметры адресов подставляются из данных: username - самый активный
+автор, post_id - его самая обсуждаемая запись, slug - самая большая
+группа, follow/unfollow - второй по активности автор. Если гость
+получает редирект на вход или 401, страница меряется от имени самого
+активного автора.
+
+Запросы идут через тестовый клиент или, с --server, по HTTP в
+wsgiref-сервер в соседнем потоке. Для каждой страницы считаются p50,
+p95, p99 и среднее время (мс), число SQL-запросов и размер ответа.
+Кэш свой, во временном файле; --cold очищает его перед каждым
+запросом. Результат - JSON (--output); --compare old.json печатает
+разницу с прошлым прогоном.
+
+Запуск: python benchmarks/latency.py [--requests 50] [--server]
+        [--cold] [--output new.json] [--compare old.json]
+"""
+import argparse
+import http.client
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (setup_test_environment,  # noqa: E402
+                               teardown_test_environment)
+from django.urls import reverse  # noqa: E402
+from wsgiref.simple_server import (WSGIRequestHandler,  # noqa: E402
+                                   make_server)
+
+import about.urls  # noqa: E402
+import posts.api_urls  # noqa: E402
+import posts.urls  # noqa: E402
+from posts import lookups  # noqa: E402
+from posts.models import Group, Post  # noqa: E402
+from yatube.testing import isolated_cache  # noqa: E402
+
+# Пространство имён -> модуль с urlpatterns
+URLCONFS = (('', posts.urls), ('api', posts.api_urls),
+            ('about', about.urls))
+QUERY = {'search': {'q': 'котик'}}
+HOST = 'testserver'
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, share):
+    """Значение по ближайшему рангу: share=0.95 для p95."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def targets():
+    """Значения параметров адресов, взятые из базы."""
+    User = get_user_model()
+    authors = list(User.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total', 'pk')[:2])
+    if len(authors) < 2:
+        sys.exit('В базе нужны хотя бы два автора с записями')
+    member, other = authors
+    post = Post.objects.filter(author=member).order_by(
+        '-comments_count', '-pk'
+    ).first()
+    group = Group.objects.annotate(
+        total=Count('post_group')
+    ).order_by('-total', 'pk').first()
+    return member, {
+        'username': member.username,
+        'post_id': post.pk if post else 1,
+        'slug': group.slug if group else 'group',
+        'other': other.username,
+    }
+
+
+def pages(values):
+    """(имя, адрес) для каждого маршрута из URLCONFS."""
+    for namespace, module in URLCONFS:
+        for pattern in module.urlpatterns:
+            name = pattern.name
+            kwargs = {
+                key: values[key] for key in pattern.pattern.converters
+            }
+            if name in ('profile_follow', 'profile_unfollow'):
+                kwargs['username'] = values['other']
+            full_name = f'{namespace}:{name}' if namespace else name
+            path = reverse(full_name, kwargs=kwargs)
+            query = QUERY.get(name)
+            if query:
+                path += '?' + urlencode(query)
+            yield full_name, path
+
+
+class TestClientTransport:
+    mode = 'client'
+
+    def __init__(self, user):
+        self.guest = Client()
+        self.member = Client()
+        self.member.force_login(user)
+
+    def get(self, path, member):
+        response = (self.member if member else self.guest).get(path)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, response.get('Location', ''), size
+
+    def close(self):
+        pass
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ServerTransport:
+    """wsgiref-сервер в потоке; соединение с базой общее с нашим."""
+    mode = 'server'
+
+    def __init__(self, user):
+        member = Client()
+        member.force_login(user)
+        cookie = member.cookies[settings.SESSION_COOKIE_NAME].value
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={cookie}'
+        shared = connections['default']
+        shared.inc_thread_sharing()
+        application = get_wsgi_application()
+
+        def app(environ, start_response):
+            connections['default'] = shared
+            return application(environ, start_response)
+
+        self.server = make_server('127.0.0.1', 0, app,
+                                  handler_class=_QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def get(self, path, member):
+        client = http.client.HTTPConnection(*self.server.server_address)
+        headers = {'Host': HOST}
+        if member:
+            headers['Cookie'] = self.cookie
+        client.request('GET', path, headers=headers)
+        response = client.getresponse()
+        size = len(response.read())
+        client.close()
+        return (response.status, response.getheader('Location', ''),
+                size)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        connections['default'].dec_thread_sharing()
+
+
+def needs_login(status, location):
+    return status == 401 or (
+        status == 302 and location.split('?')[0].endswith(
+            settings.LOGIN_URL
+        )
+    )
+
+
+def measure(transport, counter, path, requests, cold):
+    status, location, _ = transport.get(path, member=False)
+    member = needs_login(status, location)
+    times = []
+    queries = []
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+            lookups.clear_local()
+        counter.count = 0
+        started = time.perf_counter()
+        status, _, size = transport.get(path, member)
+        times.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+    return {
+        'path': path,
+        'user': 'member' if member else 'guest',
+        'status': status,
+        'requests': requests,
+        'p50_ms': round(percentile(times, 0.50), 3),
+        'p95_ms': round(percentile(times, 0.95), 3),
+        'p99_ms': round(percentile(times, 0.99), 3),
+        'mean_ms': round(statistics.mean(times), 3),
+        'queries': statistics.median_low(queries),
+        'bytes': size,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    member, values = targets()
+    transport = (ServerTransport if args.server
+                 else TestClientTransport)(member)
+    counter = QueryCounter()
+    results = {}
+    print(f'{"страница":<24} {"код":>3} {"p50":>8} {"p95":>8} {"p99":>8} '
+          f'{"SQL":>5} {"байты":>9}', file=sys.stderr)
+    try:
+        with connection.execute_wrapper(counter):
+            for name, path in pages(values):
+                results[name] = measure(transport, counter, path,
+                                        args.requests, args.cold)
+                row = results[name]
+                print(f'{name:<24} {row["status"]:>3} '
+                      f'{row["p50_ms"]:>8.2f} {row["p95_ms"]:>8.2f} '
+                      f'{row["p99_ms"]:>8.2f} {row["queries"]:>5} '
+                      f'{row["bytes"]:>9}', file=sys.stderr)
+    finally:
+        transport.close()
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'mode': transport.mode,
+            'cold': args.cold,
+            'requests': args.requests,
+            'data': None if args.existing else {
+                'users': args.users, 'posts': args.posts,
+                'comments': args.comments, 'follows': args.follows,
+                'seed': args.seed,
+            },
+        },
+        'results': results,
+    }
+
+
+def compare(old, new):
+    for key in ('mode', 'cold', 'data'):
+        if old['meta'].get(key) != new['meta'].get(key):
+            print(f'Внимание: {key} отличается: {old["meta"].get(key)} '
+                  f'против {new["meta"].get(key)}')
+    print(f'{"страница":<24} {"p50 было":>9} {"p50 стало":>10} '
+          f'{"Δ%":>7} {"запросы":>9} {"байты":>17}')
+    for name, row in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            print(f'{name:<24} {"-":>9} {row["p50_ms"]:>10.2f}')
+            continue
+        change = ((row['p50_ms'] - before['p50_ms'])
+                  / before['p50_ms'] * 100 if before['p50_ms'] else 0)
+        print(f'{name:<24} {before["p50_ms"]:>9.2f} '
+              f'{row["p50_ms"]:>10.2f} {change:>+7.1f} '
+              f'{before["queries"]:>4}→{row["queries"]:<4} '
+              f'{before["bytes"]:>8}→{row["bytes"]:<8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--server', action='store_true',
+                        help='Запросы по HTTP в wsgiref-сервер')
+    parser.add_argument('--cold', action='store_true',
+                        help='Очищать кэш перед каждым запросом')
+    parser.add_argument('--existing', action='store_true',
+                        help='Текущая база вместо временной')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--follows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Куда записать JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона')
+    args = parser.parse_args()
+
+    setup_test_environment(debug=False)
+    old_name = None
+    try:
+        if not args.existing:
+            old_name = connection.creation.create_test_db(verbosity=0)
+        with isolated_cache():
+            if not args.existing:
+                call_command(
+                    'generate_data', users=args.users, posts=args.posts,
+                    comments=args.comments, follows=args.follows,
+                    seed=args.seed, stdout=io.StringIO(),
+                )
+            cache.clear()
+            report = run(args)
+    finally:
+        if old_name is not None:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_cache():
+    from yatube.testing import isolated_cache
+
+    with isolated_cache():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(isolated_cache):
+    from yatube.testing import reset_cache
+
+    reset_cache()
@@ -0,0 +1,39 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job, OutboxMessage
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'status', 'priority', 'run_at',
+                    'attempts', 'locked_by')
+    list_filter = ('status', 'task')
+    search_fields = ('task',)
+    actions = ('retry',)
+    empty_value_display = '-пусто-'
+
+    def retry(self, request, queryset):
+        queryset.update(status=Job.QUEUED, run_at=timezone.now(),
+                        attempts=0, locked_until=None)
+    retry.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Job, JobAdmin)
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'subject', 'recipients', 'next_attempt',
+                    'attempts', 'failed')
+    list_filter = ('failed',)
+    search_fields = ('recipients', 'subject')
+    exclude = ('raw',)
+    actions = ('retry',)
+    empty_value_display = '-пусто-'
+
+    def retry(self, request, queryset):
+        queryset.update(failed=False, next_attempt=timezone.now(),
+                        attempts=0, locked_until=None)
+    retry.short_description = 'Повторить отправку'
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
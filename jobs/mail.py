@@ -0,0 +1,129 @@
+"""Отправка почты через очередь исходящих писем.
+
+OutboxBackend, указанный в EMAIL_BACKEND, только сохраняет письмо в
+таблицу и ставит в очередь задачу доставки, поэтому запрос не ждёт
+почтового сервера. deliver() забирает письма пачками по
+OUTBOX_BATCH_SIZE и отправляет их через одно соединение настоящего
+бэкенда OUTBOX_DELIVERY_BACKEND; неудачные письма повторяются с
+задержкой, как задачи очереди.
+"""
+import email
+import os
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+from email.message import Message
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, OutboxMessage
+from .queue import backoff, enqueue
+
+TASK = 'jobs.send_outbox'
+
+
+class OutboxBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        rows = [
+            OutboxMessage(
+                from_email=message.from_email,
+                recipients='\n'.join(message.recipients()),
+                subject=message.subject[:255],
+                raw=message.message().as_bytes(),
+            )
+            for message in email_messages if message.recipients()
+        ]
+        if not rows:
+            return 0
+        OutboxMessage.objects.bulk_create(rows)
+        if not Job.objects.filter(task=TASK, status=Job.QUEUED).exists():
+            enqueue(TASK)
+        return len(rows)
+
+
+class _StoredMIME(Message):
+    # Бэкенды Django вызывают as_bytes(linesep=...), как у SafeMIMEText
+    def as_bytes(self, unixfrom=False, linesep='\n'):
+        return super().as_bytes(
+            unixfrom, policy=self.policy.clone(linesep=linesep)
+        )
+
+
+class StoredMessage(EmailMessage):
+    """Сохранённое письмо в виде, который примет любой бэкенд."""
+
+    def __init__(self, row):
+        super().__init__(
+            subject=row.subject,
+            from_email=row.from_email,
+            to=row.recipients.split('\n'),
+        )
+        self.raw = bytes(row.raw)
+
+    def message(self):
+        return email.message_from_bytes(self.raw, _class=_StoredMIME)
+
+
+def _claim(token, batch_size):
+    now = timezone.now()
+    due = OutboxMessage.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        failed=False,
+        next_attempt__lte=now,
+    )
+    ids = list(due.values_list('pk', flat=True)[:batch_size])
+    due.filter(pk__in=ids).update(
+        locked_by=token,
+        locked_until=now + timedelta(seconds=settings.JOBS_LEASE),
+        attempts=F('attempts') + 1,
+    )
+    return list(OutboxMessage.objects.filter(pk__in=ids, locked_by=token))
+
+
+def _retry(rows, error):
+    now = timezone.now()
+    for row in rows:
+        OutboxMessage.objects.filter(pk=row.pk).update(
+            failed=row.attempts >= settings.OUTBOX_MAX_ATTEMPTS,
+            next_attempt=now + timedelta(seconds=backoff(row.attempts)),
+            locked_by='',
+            locked_until=None,
+            last_error=error,
+        )
+
+
+def deliver(batch_size=None):
+    """Отправляет все готовые письма; возвращает число доставленных."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    sent = 0
+    while True:
+        rows = _claim(token, batch_size)
+        if not rows:
+            return sent
+        connection = get_connection(
+            settings.OUTBOX_DELIVERY_BACKEND, fail_silently=False
+        )
+        try:
+            connection.open()
+        except Exception:
+            _retry(rows, traceback.format_exc())
+            return sent
+        try:
+            for row in rows:
+                try:
+                    connection.send_messages([StoredMessage(row)])
+                except Exception:
+                    _retry([row], traceback.format_exc())
+                else:
+                    OutboxMessage.objects.filter(
+                        pk=row.pk, locked_by=token
+                    ).delete()
+                    sent += 1
+        finally:
+            connection.close()
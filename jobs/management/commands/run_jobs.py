@@ -0,0 +1,46 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections
+
+from jobs.queue import Worker, enqueue_scheduled
+
+
+class Command(BaseCommand):
+    help = ('Выполняет задачи из очереди; можно запускать несколько '
+            'исполнителей одновременно')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти',
+        )
+        parser.add_argument('--name', help='Имя исполнителя в очереди')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['name'])
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        done = 0
+        while not self.stopping:
+            close_old_connections()
+            try:
+                enqueue_scheduled()
+                ran = worker.run_one()
+            except OperationalError:
+                # SQLite занята другим писателем дольше таймаута
+                ran = False
+            done += ran
+            if ran:
+                continue
+            if options['once']:
+                break
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+        self.stdout.write(f'Выполнено задач: {done}')
+
+    def stop(self, signum, frame):
+        # Текущая задача доделывается, новые не берутся
+        self.stopping = True
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from jobs import mail
+
+
+class Command(BaseCommand):
+    help = 'Доставляет письма из очереди исходящих'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        sent = mail.deliver(options['batch_size'])
+        self.stdout.write(f'Отправлено писем: {sent}')
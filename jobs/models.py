@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    task = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', default='{}')
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    run_at = models.DateTimeField('Запуск не раньше', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Попыток не больше', default=5
+    )
+    locked_by = models.CharField('Исполнитель', max_length=100, blank=True)
+    locked_until = models.DateTimeField(
+        'Занята до', null=True, blank=True
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-priority', 'run_at', 'id')
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='job_claim_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
+
+
+class Schedule(models.Model):
+    """Когда в следующий раз ставить в очередь периодическую задачу."""
+
+    name = models.CharField(max_length=100, primary_key=True)
+    next_run = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+
+class OutboxMessage(models.Model):
+    """Письмо, принятое OutboxBackend и ещё не доставленное."""
+
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.TextField('Получатели')
+    subject = models.CharField('Тема', max_length=255, blank=True)
+    raw = models.BinaryField('Письмо')
+    next_attempt = models.DateTimeField(
+        'Следующая попытка', default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    failed = models.BooleanField('Не доставлено', default=False)
+    locked_by = models.CharField('Отправитель очереди', max_length=100,
+                                 blank=True)
+    locked_until = models.DateTimeField('Занято до', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        ordering = ('next_attempt', 'id')
+        indexes = [
+            models.Index(
+                fields=['failed', 'next_attempt'], name='outbox_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.subject or f'Письмо #{self.pk}'
@@ -0,0 +1,209 @@
+"""Очередь фоновых задач в основной базе.
+
+Задача объявляется декоратором @task в модуле tasks приложения и ставится
+в очередь через .delay() или enqueue(). Строка задачи пишется в той же
+транзакции, что и данные, поэтому исполнитель увидит её только после
+фиксации, а при откате её не будет вовсе.
+
+Исполнитель (manage.py run_jobs) забирает задачу условным UPDATE: из
+нескольких исполнителей строку получает только тот, у кого обновилась
+одна строка. Задача занята на JOBS_LEASE секунд; если исполнитель
+упал, после этого её заберёт другой. Упавшая задача повторяется с
+экспоненциальной задержкой, пока не кончатся попытки.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, Schedule
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return enqueue(self.name, args, kwargs)
+
+
+def task(name=None, priority=0, max_attempts=5):
+    """Регистрирует функцию как задачу; аргументы должны быть JSON."""
+    def decorator(func):
+        task_name = name or (
+            f'{func.__module__.split(".")[0]}.{func.__name__}'
+        )
+        _registry[task_name] = Task(func, task_name, priority, max_attempts)
+        return _registry[task_name]
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'Задача {name} не зарегистрирована') from None
+
+
+def enqueue(name, args=(), kwargs=None, priority=None, countdown=0):
+    """Ставит задачу в очередь; видна исполнителям после фиксации.
+
+    С JOBS_EAGER задача выполняется в этом же процессе сразу после
+    фиксации транзакции, без исполнителя.
+    """
+    task = get_task(name)
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: _call(task, payload))
+        return None
+    return Job.objects.create(
+        task=name,
+        payload=payload,
+        priority=task.priority if priority is None else priority,
+        max_attempts=task.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def enqueue_many(name, args_list, priority=None):
+    """Ставит одну задачу в очередь для каждого набора аргументов.
+
+    Строки пишутся одним bulk_create; возвращает их число.
+    """
+    task = get_task(name)
+    payloads = [
+        json.dumps({'args': list(args), 'kwargs': {}}) for args in args_list
+    ]
+    if settings.JOBS_EAGER:
+        for payload in payloads:
+            transaction.on_commit(
+                lambda payload=payload: _call(task, payload)
+            )
+        return len(payloads)
+    now = timezone.now()
+    Job.objects.bulk_create(
+        Job(
+            task=name,
+            payload=payload,
+            priority=task.priority if priority is None else priority,
+            max_attempts=task.max_attempts,
+            run_at=now,
+        )
+        for payload in payloads
+    )
+    return len(payloads)
+
+
+def _call(task, payload):
+    data = json.loads(payload)
+    return task(*data['args'], **data['kwargs'])
+
+
+def backoff(attempts):
+    """Задержка перед повтором: растёт вдвое, со случайным разбросом."""
+    delay = min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_MAX_DELAY,
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def enqueue_scheduled(now=None):
+    """Ставит в очередь периодические задачи из JOBS_SCHEDULE.
+
+    Срок следующего запуска сдвигается условным UPDATE, поэтому из
+    нескольких исполнителей задачу поставит только один.
+    """
+    now = now or timezone.now()
+    queued = []
+    for name, entry in settings.JOBS_SCHEDULE.items():
+        schedule, _ = Schedule.objects.get_or_create(
+            name=name, defaults={'next_run': now}
+        )
+        if schedule.next_run > now:
+            continue
+        with transaction.atomic():
+            moved = Schedule.objects.filter(
+                name=name, next_run=schedule.next_run
+            ).update(next_run=now + timedelta(seconds=entry['every']))
+            if moved:
+                enqueue(entry['task'], entry.get('args', ()),
+                        entry.get('kwargs'))
+                queued.append(name)
+    return queued
+
+
+class Worker:
+    def __init__(self, name=None):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    def claim(self):
+        """Забирает следующую готовую задачу или возвращает None."""
+        now = timezone.now()
+        ready = Job.objects.filter(
+            Q(status=Job.QUEUED, run_at__lte=now)
+            | Q(status=Job.RUNNING, locked_until__lt=now)
+        ).order_by('-priority', 'run_at', 'id')
+        for pk in ready.values_list('pk', flat=True)[:10]:
+            claimed = Job.objects.filter(
+                Q(status=Job.QUEUED) | Q(locked_until__lt=now), pk=pk
+            ).update(
+                status=Job.RUNNING,
+                locked_by=self.name,
+                locked_until=now + timedelta(seconds=settings.JOBS_LEASE),
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+        return None
+
+    def run_one(self):
+        """Выполняет одну задачу; False, если выполнять было нечего."""
+        job = self.claim()
+        if job is None:
+            return False
+        if job.attempts > job.max_attempts:
+            # Исполнитель падал на ней, пока не кончились попытки
+            self._fail(job, 'Истёк срок занятости задачи')
+            return True
+        try:
+            _call(get_task(job.task), job.payload)
+        except Exception:
+            self._fail(job, traceback.format_exc())
+        else:
+            Job.objects.filter(pk=job.pk, locked_by=self.name).delete()
+        return True
+
+    def _fail(self, job, error):
+        logger.error('Задача %s завершилась ошибкой:\n%s', job, error)
+        jobs = Job.objects.filter(pk=job.pk, locked_by=self.name)
+        if job.attempts >= job.max_attempts:
+            jobs.update(status=Job.FAILED, last_error=error,
+                        locked_until=None)
+            return
+        jobs.update(
+            status=Job.QUEUED,
+            last_error=error,
+            locked_until=None,
+            run_at=timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            ),
+        )
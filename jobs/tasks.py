@@ -0,0 +1,7 @@
+from . import mail
+from .queue import task
+
+
+@task(priority=5)
+def send_outbox():
+    mail.deliver()
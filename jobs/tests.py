@@ -0,0 +1,222 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import mail as outbox
+from .models import Job, OutboxMessage, Schedule
+from .queue import Worker, enqueue, enqueue_scheduled, task
+
+calls = []
+
+
+@task(name='jobs.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.broken', max_attempts=2)
+def broken():
+    raise ValueError('сломано')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker('test')
+
+    def test_job_runs_and_is_removed(self):
+        record.delay('раз')
+        self.assertEqual(calls, [], 'Задача выполнена в момент постановки')
+        self.assertTrue(self.worker.run_one())
+        self.assertEqual(calls, ['раз'])
+        self.assertFalse(Job.objects.exists(), 'Выполненная задача осталась')
+        self.assertFalse(self.worker.run_one())
+
+    def test_priority_and_delay(self):
+        enqueue('jobs.record', ['поздняя'], countdown=60)
+        enqueue('jobs.record', ['обычная'])
+        enqueue('jobs.record', ['срочная'], priority=10)
+        while self.worker.run_one():
+            pass
+        self.assertEqual(
+            calls, ['срочная', 'обычная'],
+            'Неверный порядок задач или отложенная задача выполнена раньше'
+        )
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        record.delay('раз')
+        self.assertIsNotNone(self.worker.claim())
+        self.assertIsNone(
+            Worker('other').claim(), 'Задачу забрали два исполнителя'
+        )
+
+    def test_expired_lease_is_reclaimed(self):
+        record.delay('раз')
+        job = self.worker.claim()
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertTrue(Worker('other').run_one())
+        self.assertEqual(calls, ['раз'], 'Брошенная задача не подхвачена')
+
+    def test_retry_with_backoff_then_fail(self):
+        job = broken.delay()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.worker.run_one()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now(), 'Повтор без задержки')
+        self.assertIn('сломано', job.last_error)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.worker.run_one()
+        job.refresh_from_db()
+        self.assertEqual(
+            job.status, Job.FAILED, 'Задача не остановлена после попыток'
+        )
+        self.assertFalse(self.worker.run_one())
+
+    @override_settings(JOBS_SCHEDULE={
+        'tick': {'task': 'jobs.record', 'args': ['тик'], 'every': 60},
+    })
+    def test_schedule_enqueues_once_per_period(self):
+        now = timezone.now()
+        self.assertEqual(enqueue_scheduled(now), ['tick'])
+        self.assertEqual(enqueue_scheduled(now), [])
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(
+            Schedule.objects.get(name='tick').next_run,
+            now + timedelta(seconds=60),
+        )
+        self.assertEqual(
+            enqueue_scheduled(now + timedelta(seconds=61)), ['tick']
+        )
+
+    def test_rolled_back_job_is_dropped(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            record.delay('раз')
+            raise ValueError
+        self.assertFalse(Job.objects.exists(), 'Задача пережила откат')
+
+    @override_settings(JOBS_EAGER=True)
+    @mock.patch('django.db.transaction.on_commit', lambda func: func())
+    def test_eager_mode(self):
+        record.delay('раз')
+        self.assertEqual(calls, ['раз'])
+        self.assertFalse(Job.objects.exists())
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+
+class BrokenBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('сервер недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='jobs.mail.OutboxBackend',
+    OUTBOX_DELIVERY_BACKEND='jobs.tests.CountingBackend',
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def send(self, count=1):
+        for number in range(count):
+            mail.send_mail(
+                f'Письмо {number}', 'Текст письма', 'from@yatube.ru',
+                [f'user{number}@yatube.ru'],
+            )
+
+    def test_send_only_stores_message(self):
+        self.send(2)
+        self.assertEqual(mail.outbox, [], 'Письмо отправлено из запроса')
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+        self.assertEqual(
+            Job.objects.filter(task=outbox.TASK).count(), 1,
+            'Доставка поставлена в очередь не один раз'
+        )
+
+    def test_password_reset_goes_to_outbox(self):
+        get_user_model().objects.create(
+            username='Test', email='test@yatube.ru'
+        )
+        self.client.post(
+            '/auth/password_reset/', {'email': 'test@yatube.ru'}
+        )
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            OutboxMessage.objects.get().recipients, 'test@yatube.ru'
+        )
+
+    def test_deliver_in_batches_over_one_connection(self):
+        self.send(3)
+        mail.EmailMessage(
+            'Скрытая копия', 'Текст', 'from@yatube.ru',
+            ['to@yatube.ru'], bcc=['bcc@yatube.ru'],
+        ).send()
+        self.assertEqual(outbox.deliver(batch_size=2), 4)
+        self.assertEqual(
+            CountingBackend.opened, 2, 'Соединение не одно на пачку'
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ['Письмо 0', 'Письмо 1', 'Письмо 2', 'Скрытая копия'],
+        )
+        self.assertEqual(
+            mail.outbox[3].recipients(), ['to@yatube.ru', 'bcc@yatube.ru']
+        )
+        self.assertNotIn(
+            b'bcc@yatube.ru', mail.outbox[3].message().as_bytes()
+        )
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2,
+                       OUTBOX_DELIVERY_BACKEND='jobs.tests.BrokenBackend')
+    def test_failed_delivery_is_retried(self):
+        self.send()
+        self.assertEqual(outbox.deliver(), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertFalse(message.failed)
+        self.assertGreater(message.next_attempt, timezone.now())
+        self.assertIn('сервер недоступен', message.last_error)
+        OutboxMessage.objects.update(next_attempt=timezone.now())
+        outbox.deliver()
+        self.assertTrue(
+            OutboxMessage.objects.get().failed, 'Попытки не ограничены'
+        )
+
+    def test_file_backend(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.send()
+        with self.settings(
+            OUTBOX_DELIVERY_BACKEND=(
+                'django.core.mail.backends.filebased.EmailBackend'
+            ),
+            EMAIL_FILE_PATH=directory,
+        ):
+            outbox.deliver()
+        [name] = os.listdir(directory)
+        with open(os.path.join(directory, name), encoding='utf-8') as file:
+            text = file.read()
+        self.assertIn('To: user0@yatube.ru', text)
+        self.assertIn('Текст письма', text)
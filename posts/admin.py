@@ -1,13 +1,61 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from . import search
+from .models import Comment, Follow, Group, Post
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator списков админки, который считает COUNT(*) не на каждый клик.
+
+    Число строк для каждого запроса хранится в кэше ADMIN_COUNT_TIMEOUT
+    секунд, поэтому на больших таблицах листание не упирается в подсчёт.
+    """
 
-from .models import Group, Post
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return 0
+        key = f'admin:count:{hashlib.md5(sql.encode()).hexdigest()}'
+        return cache.get_or_set(
+            key, self.object_list.count, settings.ADMIN_COUNT_TIMEOUT
+        )
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('text', 'pub_date', 'author')
+class LargeTableAdmin(admin.ModelAdmin):
+    """Админка больших таблиц.
+
+    date_hierarchy не используется: на каждое открытие списка она
+    выбирает годы и месяцы через SELECT DISTINCT по всей таблице.
+    Фильтр по дате (DateFieldListFilter) обходится без запросов.
+    """
+    paginator = CachedCountPaginator
+    # Без второго COUNT(*) по всей таблице рядом с результатами фильтра
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class PostAdmin(LargeTableAdmin):
+    list_display = ('text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идёт через полнотекстовый индекс, а не LIKE
+        if not search_term:
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -16,6 +64,27 @@ admin.site.register(Post, PostAdmin)
 class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_display = ('title', 'slug', 'description')
+    search_fields = ('title', 'slug')
 
 
 admin.site.register(Group, GroupAdmin)
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    list_filter = ('created',)
+    raw_id_fields = ('post', 'author')
+
+
+admin.site.register(Comment, CommentAdmin)
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+
+
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,180 @@
+"""Только для чтения: ленты записей в JSON для машинных клиентов.
+
+Запросы те же, что у HTML-страниц posts.views, но строки берутся
+.values() и сразу становятся словарями ответа, без экземпляров моделей
+и шаблонов. Ленты листаются курсором (pub_date, id) из posts.paginators:
+?cursor= из поля next предыдущего ответа. ?fields=id,text оставляет в
+ответе только перечисленные поля.
+"""
+import heapq
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_safe
+
+from .caching import conditional, group_scopes, index_scopes, profile_scopes
+from .feeds import feed_sources
+from .lookups import group_or_404, user_or_404
+from .models import Comment, Post
+from .paginators import NEXT, decode_cursor, encode_key, ordered
+from .storage import post_images
+
+PER_PAGE = 10
+MAX_PER_PAGE = 100
+# Поле ответа -> поле запроса
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = ('id', 'author__username', 'text', 'created')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def _response(data):
+    return JsonResponse(data, encoder=DjangoJSONEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def api_view(view):
+    """GET-представление API: ошибки и 404 отдаются в JSON."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return _error(str(error), error.status)
+        except Http404 as error:
+            return _error(str(error) or 'Не найдено', 404)
+    return require_safe(wrapper)
+
+
+def requested_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(POST_FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in POST_FIELDS]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def _per_page(request):
+    try:
+        value = int(request.GET.get('limit', PER_PAGE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return max(1, min(value, MAX_PER_PAGE))
+
+
+def _rows(source, fields):
+    # Курсору нужны pub_date и id, даже если их не просили
+    columns = {POST_FIELDS[name] for name in fields} | {'id', 'pub_date'}
+    return source.values(*columns)
+
+
+def _serialize(row, fields):
+    item = {name: row[POST_FIELDS[name]] for name in fields}
+    if item.get('image'):
+        item['image'] = post_images.url(item['image'])
+    elif 'image' in item:
+        item['image'] = None
+    return item
+
+
+def feed_page(request, queryset, pulled=()):
+    """Страница ленты по курсору из одного или нескольких источников."""
+    fields = requested_fields(request)
+    per_page = _per_page(request)
+    token = request.GET.get('cursor')
+    cursor = None
+    if token:
+        cursor = decode_cursor(token)
+        if cursor is None or cursor[0] != NEXT:
+            raise ApiError('Неверный курсор')
+    streams = []
+    for source in (queryset, *pulled):
+        source = ordered(source, cursor)
+        streams.append(list(_rows(source, fields)[:per_page + 1]))
+    rows = []
+    for row in heapq.merge(
+        *streams, key=lambda row: (row['pub_date'], row['id']), reverse=True
+    ):
+        if not rows or rows[-1]['id'] != row['id']:
+            rows.append(row)
+    next_url = None
+    if len(rows) > per_page:
+        last = rows[per_page - 1]
+        query = request.GET.copy()
+        query['cursor'] = encode_key(NEXT, last['pub_date'], last['id'])
+        next_url = f'{request.path}?{query.urlencode()}'
+    return _response({
+        'results': [_serialize(row, fields) for row in rows[:per_page]],
+        'next': next_url,
+    })
+
+
+@api_view
+@conditional(index_scopes)
+def index(request):
+    return feed_page(request, Post.objects.all())
+
+
+@api_view
+@conditional(group_scopes)
+def group_posts(request, slug):
+    group = group_or_404(slug)
+    return feed_page(request, Post.objects.filter(group=group))
+
+
+@api_view
+@conditional(profile_scopes)
+def profile(request, username):
+    author = user_or_404(username)
+    return feed_page(request, Post.objects.filter(author=author))
+
+
+@api_view
+@conditional(profile_scopes)
+def post_detail(request, username, post_id):
+    author = user_or_404(username)
+    fields = requested_fields(request)
+    row = _rows(
+        Post.objects.filter(id=post_id, author=author), fields
+    ).first()
+    if row is None:
+        raise ApiError('Запись не найдена', 404)
+    comments = Comment.objects.filter(post=post_id).order_by(
+        'created', 'id'
+    ).values_list(*COMMENT_FIELDS)
+    return _response({
+        **_serialize(row, fields),
+        'comments': [
+            {'id': pk, 'author': name, 'text': text, 'created': created}
+            for pk, name, text, created in comments
+        ],
+    })
+
+
+@api_view
+def follow(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', 401)
+    entries, pulled = feed_sources(request.user)
+    return feed_page(request, entries, pulled)
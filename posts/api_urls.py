@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.index, name='index'),
+    path('groups/<slug:slug>/posts/', api.group_posts, name='group_posts'),
+    path('users/<str:username>/posts/', api.profile, name='profile'),
+    path(
+        'users/<str:username>/posts/<int:post_id>/',
+        api.post_detail,
+        name='post'
+    ),
+    path('follow/', api.follow, name='follow'),
+]
@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from . import signals  # noqa
+
+        # Защита от «бомб»: Pillow откажется разжимать картинки больше
+        # этого числа пикселей, где бы их ни открывали
+        Image.MAX_IMAGE_PIXELS = settings.POST_IMAGE_MAX_PIXELS
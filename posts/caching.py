@@ -0,0 +1,221 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.views.decorators.http import condition
+
+from . import lookups
+from .models import Post
+
+
+def _key(scope):
+    return f'posts:generation:{scope}'
+
+
+def _initial():
+    # Начинаем со времени в миллисекундах, чтобы вытесненное из кэша
+    # поколение не совпало со старым и не подняло устаревшие фрагменты.
+    return int(time.time() * 1000)
+
+
+def generations(*scopes):
+    keys = [_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _initial(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сдвигает поколения, делая недействительными зависящие фрагменты."""
+    for scope in set(scopes):
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.add(_key(scope), _initial(), None)
+
+
+def post_scopes(post, group_id=None):
+    scopes = ['index', f'profile:{post.author_id}']
+    for pk in (post.group_id, group_id):
+        if pk is not None:
+            scopes.append(f'group:{pk}')
+    return scopes
+
+
+def index_scopes(request):
+    return ['index']
+
+
+def group_scopes(request, slug):
+    group = lookups.get_group(slug)
+    return None if group is None else [f'group:{group.pk}']
+
+
+def profile_scopes(request, username, post_id=None):
+    """Области страницы автора и страницы записи: лента, счётчики, группы."""
+    user = lookups.get_user(username)
+    if user is None:
+        return None
+    return [f'profile:{user.pk}', f'author:{user.pk}', 'groups']
+
+
+def conditional(get_scopes):
+    """Условный GET для анонимных посетителей: 304 без рендеринга.
+
+    ETag строится из поколений областей страницы, так что запрос ленты
+    не выполняется. Last-Modified не отдаётся: с точностью до секунды он
+    выдал бы 304 на страницу, изменённую в ту же секунду, что и прочитанную.
+    """
+    def scopes(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_scopes'):
+            request._conditional_scopes = None
+            if not request.user.is_authenticated:
+                request._conditional_scopes = get_scopes(
+                    request, *args, **kwargs
+                )
+        return request._conditional_scopes
+
+    def etag(request, *args, **kwargs):
+        found = scopes(request, *args, **kwargs)
+        if found is None:
+            return None
+        versions = generations(*found)
+        return hashlib.md5(
+            f'{request.get_full_path()}|{versions}'.encode()
+        ).hexdigest()
+
+    return condition(etag_func=etag)
+
+
+def card_context():
+    """Срок жизни {% cache %}-фрагментов карточек post_item.html."""
+    return {'cache_timeout': settings.POSTS_CACHE_TIMEOUT}
+
+
+def fragment_context(request, page, *scopes):
+    """Ключ и срок жизни {% cache %}-фрагмента со списком записей."""
+    position = page.number or request.GET.get('cursor')
+    versions = '.'.join(str(value) for value in generations(*scopes))
+    return {
+        'cache_key': f'{versions}:{position}',
+        **card_context(),
+    }
+
+
+# Поля, которые выводит карточка post_item.html; автор и группа попадают
+# в общий кэш только ими, без пароля, почты и прочего
+CARD_FIELDS = (
+    'text', 'pub_date', 'updated', 'image', 'comments_count',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+
+
+def _head_scope(scope):
+    return f'head:{scope}'
+
+
+def _post_key(pk):
+    return f'posts:post:{pk}'
+
+
+def get_posts(ids):
+    """Собирает записи по id: один get_many и один id__in на промахи."""
+    keys = {pk: _post_key(pk) for pk in ids}
+    found = cache.get_many(keys.values())
+    posts = {pk: found[key] for pk, key in keys.items() if key in found}
+    missing = [pk for pk in ids if pk not in posts]
+    if missing:
+        fetched = Post.objects.for_listing().only(*CARD_FIELDS).in_bulk(
+            missing
+        )
+        cache.set_many(
+            {_post_key(pk): post for pk, post in fetched.items()},
+            settings.POSTS_CACHE_TIMEOUT,
+        )
+        posts.update(fetched)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def _get_head(queryset, scope):
+    # Ключ привязан к своему поколению: новая или удалённая запись не
+    # правит закэшированный список, а переводит чтение на новый ключ
+    generation, = generations(_head_scope(scope))
+    key = f'posts:head:{scope}:{generation}'
+    head = cache.get(key)
+    if head is None:
+        head = {
+            'ids': list(queryset.values_list('pk', flat=True)[
+                :settings.POSTS_HEAD_LENGTH
+            ]),
+            'count': queryset.count(),
+        }
+        cache.set(key, head, settings.POSTS_HEAD_TIMEOUT)
+    return head
+
+
+def head_page(paginator, number, scope):
+    """Страница из закэшированного начала ленты или None, если её там нет.
+
+    Количество записей тоже берётся из кэша, поэтому COUNT не выполняется.
+    """
+    head = _get_head(paginator.object_list, scope)
+    paginator.count = head['count']
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+    bottom = (number - 1) * paginator.per_page
+    top = bottom + paginator.per_page
+    ids = head['ids']
+    if top > len(ids) and len(ids) < head['count']:
+        return None
+    return paginator._get_page(get_posts(ids[bottom:top]), number, paginator)
+
+
+def _bump_heads(scopes):
+    bump(*(_head_scope(scope) for scope in scopes))
+
+
+def post_created(post):
+    _bump_heads(post_scopes(post))
+
+
+def post_removed(post):
+    cache.delete(_post_key(post.pk))
+    _bump_heads(post_scopes(post))
+
+
+def post_changed(post, old_group_id):
+    """Правка записи сбрасывает только её ключ, а не списки id."""
+    cache.delete(_post_key(post.pk))
+    if old_group_id != post.group_id:
+        _bump_heads(f'group:{pk}' for pk in (old_group_id, post.group_id)
+                    if pk is not None)
+
+
+def _drop_posts(posts):
+    ids = posts.values_list('pk', flat=True)
+    drop_posts(ids.iterator())
+
+
+def drop_posts(ids):
+    cache.delete_many([_post_key(pk) for pk in ids])
+
+
+def author_changed(user):
+    """Новое имя автора: сбрасывает его записи и ленты с ними."""
+    posts = Post.objects.filter(author=user)
+    _drop_posts(posts)
+    groups = posts.exclude(group=None).values_list(
+        'group_id', flat=True
+    ).distinct()
+    bump('index', f'profile:{user.pk}',
+         *(f'group:{pk}' for pk in groups))
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'followings_count': (Follow, 'user'),
+}
+
+
+def bump_user(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя F-выражениями."""
+    values = {field: F(field) + delta for field, delta in deltas.items()}
+    if UserStats.objects.filter(user_id=user_id).update(**values):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**values)
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def get_stats(user):
+    # Не через user.stats: объект пользователя может лежать в кэше
+    # поиска, и счётчики не должны застревать в нём.
+    stats = UserStats.objects.filter(user_id=user.pk).first()
+    return stats or UserStats(user_id=user.pk)
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile_users(batch_size):
+    """Сверяет счётчики пользователей с данными пачками по batch_size.
+
+    Возвращает число исправленных записей.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        users = list(User.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).annotate(**{
+            field: _count(model, lookup)
+            for field, (model, lookup) in USER_COUNTERS.items()
+        }).values('pk', *USER_COUNTERS)[:batch_size])
+        if not users:
+            return fixed
+        last_pk = users[-1]['pk']
+        fixed += _fix_users(users)
+
+
+def _fix_users(users):
+    with transaction.atomic():
+        stored = UserStats.objects.in_bulk([user['pk'] for user in users])
+        changed, created = [], []
+        for user in users:
+            stats = stored.get(user['pk'])
+            if stats is None:
+                stats = UserStats(user_id=user['pk'])
+                created.append(stats)
+            elif all(getattr(stats, field) == user[field]
+                     for field in USER_COUNTERS):
+                continue
+            else:
+                changed.append(stats)
+            for field in USER_COUNTERS:
+                setattr(stats, field, user[field])
+        UserStats.objects.bulk_create(created)
+        UserStats.objects.bulk_update(changed, list(USER_COUNTERS))
+    return len(changed) + len(created)
+
+
+def reconcile_posts(batch_size):
+    fixed = 0
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).annotate(
+            actual=_count(Comment, 'post')
+        ).only('pk', 'comments_count')[:batch_size])
+        if not posts:
+            return fixed
+        last_pk = posts[-1].pk
+        changed = [post for post in posts
+                   if post.comments_count != post.actual]
+        for post in changed:
+            post.comments_count = post.actual
+        Post.objects.bulk_update(changed, ['comments_count'])
+        fixed += len(changed)
@@ -0,0 +1,136 @@
+"""Потоковая выгрузка записей и комментариев автора.
+
+Строки читаются из базы .values().iterator(chunk_size=...) и сразу
+отдаются кусками, поэтому память не зависит от числа записей. Архив zip
+тоже пишется потоком: zipfile умеет писать в файл без seek, а каждый
+записанный кусок сразу отдаётся клиенту. Картинки кладутся в архив
+без сжатия, каждая один раз.
+"""
+import csv
+import io
+import json
+import time
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+from .storage import post_images
+
+CHUNK_SIZE = 2000
+FORMATS = ('ndjson', 'csv')
+CSV_FIELDS = ('type', 'id', 'post', 'group', 'date', 'text', 'image')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'zip': 'application/zip',
+}
+
+
+def records(author):
+    """Словари записей, затем комментариев автора."""
+    posts = Post.objects.filter(author=author).order_by('pk').values_list(
+        'pk', 'group__slug', 'pub_date', 'text', 'image'
+    )
+    for pk, group, pub_date, text, image in posts.iterator(CHUNK_SIZE):
+        yield {'type': 'post', 'id': pk, 'group': group, 'date': pub_date,
+               'text': text, 'image': image or None}
+    comments = Comment.objects.filter(author=author).order_by(
+        'pk'
+    ).values_list('pk', 'post_id', 'created', 'text')
+    for pk, post, created, text in comments.iterator(CHUNK_SIZE):
+        yield {'type': 'comment', 'id': pk, 'post': post, 'date': created,
+               'text': text}
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream(author, file_format='ndjson'):
+    """Байты выгрузки в формате ndjson или csv."""
+    lines = ndjson_lines if file_format == 'ndjson' else csv_lines
+    for line in lines(records(author)):
+        if line:
+            yield line.encode()
+
+
+class _Sink(io.RawIOBase):
+    """Файл без seek: zipfile пишет в него, мы забираем написанное."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _drain(archive_chunks, sink):
+    # Пустые куски клиенту не нужны
+    for _ in archive_chunks:
+        data = sink.take()
+        if data:
+            yield data
+
+
+def _entry(name, compress_type):
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = compress_type
+    return info
+
+
+def stream_zip(author, file_format='ndjson'):
+    """Архив с выгрузкой и картинками записей автора.
+
+    Картинки лежат в images/ под теми же именами, что в поле image.
+    """
+    sink = _Sink()
+    return _drain(_write_zip(sink, author, file_format), sink)
+
+
+def _write_zip(sink, author, file_format):
+    # Генератор отдаёт управление после каждого записанного куска
+    with zipfile.ZipFile(sink, 'w') as archive:
+        entry = _entry(f'export.{file_format}', zipfile.ZIP_DEFLATED)
+        with archive.open(entry, 'w', force_zip64=True) as output:
+            for chunk in stream(author, file_format):
+                output.write(chunk)
+                yield
+        images = Post.objects.filter(author=author).exclude(
+            image=''
+        ).exclude(image__isnull=True).order_by('image').values_list(
+            'image', flat=True
+        ).distinct()
+        for name in images.iterator(CHUNK_SIZE):
+            if not post_images.exists(name):
+                continue
+            entry = _entry(f'images/{name}', zipfile.ZIP_STORED)
+            with post_images.open(name) as source, archive.open(
+                entry, 'w', force_zip64=True
+            ) as output:
+                for chunk in source.chunks():
+                    output.write(chunk)
+                    yield
+    yield
@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+
+from .models import FeedEntry, Follow, Post, UserStats
+
+BATCH_SIZE = 500
+PULL_AUTHORS_KEY = 'feeds:pull_authors'
+
+
+def _store(user_id, posts):
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_ids):
+    """Обрезает ленты пользователей до FEED_MAX_LENGTH записей."""
+    oldest_kept = FeedEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by('-pub_date', '-post_id').values('pub_date')[
+        settings.FEED_MAX_LENGTH - 1:settings.FEED_MAX_LENGTH
+    ]
+    FeedEntry.objects.filter(
+        user_id__in=user_ids, pub_date__lt=Subquery(oldest_kept)
+    ).delete()
+
+
+def refresh_pull_authors():
+    """Пересчитывает авторов, чьи записи лента подтягивает при чтении.
+
+    Это авторы с числом подписчиков не меньше FEED_PULL_THRESHOLD. Список
+    хранится в UserStats.pulled; подписчикам авторов, опустившихся ниже
+    порога, дозаполняются ленты. Запускается по расписанию или командой.
+    """
+    with transaction.atomic():
+        authors = frozenset(Follow.objects.values('author_id').annotate(
+            followers=Count('id')
+        ).filter(
+            followers__gte=settings.FEED_PULL_THRESHOLD
+        ).values_list('author_id', flat=True))
+        stored = set(UserStats.objects.select_for_update().filter(
+            pulled=True
+        ).values_list('user_id', flat=True))
+        demoted = stored - authors
+        promoted = authors - stored
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=author_id) for author_id in promoted],
+            ignore_conflicts=True,
+        )
+        UserStats.objects.filter(user_id__in=promoted).update(pulled=True)
+        UserStats.objects.filter(user_id__in=demoted).update(pulled=False)
+        for author_id in demoted:
+            followers = Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True)
+            for user_id in followers.iterator():
+                _backfill(user_id, author_id)
+    cache.set(PULL_AUTHORS_KEY, authors, settings.FEED_PULL_REFRESH)
+    return authors
+
+
+def pull_authors():
+    """Сохранённый список авторов, которых лента подтягивает при чтении."""
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(UserStats.objects.filter(
+            pulled=True
+        ).values_list('user_id', flat=True))
+        cache.set(PULL_AUTHORS_KEY, authors, settings.FEED_PULL_REFRESH)
+    return authors
+
+
+def fan_out(post):
+    """Раскладывает новую запись по лентам подписчиков автора.
+
+    Записи авторов с большим числом подписчиков не раскладываются,
+    их читает feed_sources.
+    """
+    if post.author_id in pull_authors():
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    for start in range(0, len(followers), BATCH_SIZE):
+        trim(followers[start:start + BATCH_SIZE])
+
+
+def backfill(user_id, author_id):
+    if author_id not in pull_authors():
+        _backfill(user_id, author_id)
+
+
+def _backfill(user_id, author_id):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )[:settings.FEED_MAX_LENGTH]
+    _store(user_id, posts)
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Собирает ленту пользователя заново по его подпискам."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(user_id=user_id).values('author_id')
+    posts = Post.objects.filter(author_id__in=authors).values_list(
+        'id', 'pub_date'
+    )[:settings.FEED_MAX_LENGTH]
+    _store(user_id, posts)
+
+
+def rebuild_all():
+    """Собирает ленты всех подписчиков одним запросом.
+
+    Каждой ленте хватает FEED_MAX_LENGTH последних записей каждого автора,
+    поэтому сначала записи нумеруются внутри автора, а затем внутри
+    подписчика. Записи популярных авторов, как и в fan_out, не
+    раскладываются. Возвращает число записей во всех лентах.
+    """
+    pulled = sorted(pull_authors())
+    skip = ''
+    if pulled:
+        skip = f'WHERE author_id NOT IN ({", ".join(["%s"] * len(pulled))})'
+    entries = FeedEntry._meta.db_table
+    sql = f"""
+        INSERT INTO {entries} (user_id, post_id, pub_date)
+        SELECT user_id, id, pub_date FROM (
+            SELECT follow.user_id, post.id, post.pub_date, ROW_NUMBER() OVER (
+                PARTITION BY follow.user_id
+                ORDER BY post.pub_date DESC, post.id DESC
+            ) AS position
+            FROM (
+                SELECT DISTINCT user_id, author_id
+                FROM {Follow._meta.db_table} {skip}
+            ) AS follow
+            JOIN (
+                SELECT id, author_id, pub_date FROM (
+                    SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+                        PARTITION BY author_id
+                        ORDER BY pub_date DESC, id DESC
+                    ) AS position
+                    FROM {Post._meta.db_table}
+                ) AS ranked WHERE position <= %s
+            ) AS post ON post.author_id = follow.author_id
+        ) AS feed WHERE position <= %s
+    """
+    with transaction.atomic(), connection.cursor() as db:
+        FeedEntry.objects.all().delete()
+        db.execute(sql, [*pulled, settings.FEED_MAX_LENGTH,
+                         settings.FEED_MAX_LENGTH])
+        return db.rowcount
+
+
+def feed_sources(user):
+    """Источники ленты: разложенные записи и записи популярных авторов."""
+    pulled = Follow.objects.filter(
+        user=user, author_id__in=pull_authors()
+    ).values_list('author_id', flat=True)
+    posts = Post.objects.for_listing()
+    # Ключ берётся из FeedEntry: по индексу feed_user_pub_date_idx
+    # читается только нужный участок ленты, без сортировки всех записей
+    entries = posts.filter(feed_entries__user=user).annotate(
+        feed_date=F('feed_entries__pub_date'),
+        feed_post=F('feed_entries__post_id'),
+    ).order_by('-feed_date', '-feed_post')
+    return entries, [
+        posts.filter(author_id=author_id) for author_id in pulled
+    ]
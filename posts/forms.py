@@ -1,6 +1,40 @@
+import os
+from io import BytesIO
+
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from PIL import Image, ImageOps
 
 from .models import Comment, Post
+from .uploads import RejectedUpload
+
+
+def downscale(upload):
+    """Уменьшает слишком большую картинку до POST_IMAGE_MAX_SIDE по стороне.
+
+    JPEG декодируется сразу в уменьшенном масштабе (draft), так что
+    полный растр оригинала в памяти не держится. Поворот из EXIF
+    применяется заранее: после пересохранения EXIF не останется.
+    Анимация сохраняется как есть: пересохранение оставило бы один кадр.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    limit = settings.POST_IMAGE_MAX_SIDE
+    if max(image.size) <= limit or getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return upload
+    image_format = image.format
+    image.draft('RGB', (limit, limit))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=90)
+    return SimpleUploadedFile(
+        os.path.basename(upload.name),
+        buffer.getvalue(),
+        Image.MIME.get(image_format),
+    )
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +42,30 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = 'group', 'text', 'image'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Отвергнутые при загрузке файлы (см. posts.uploads) поле не видит,
+        # их ошибки добавляются в clean()
+        self.rejected = {}
+        for name, upload in self.files.items():
+            if isinstance(upload, RejectedUpload):
+                self.rejected[name] = upload.error
+        if self.rejected:
+            self.files = self.files.copy()
+            for name in self.rejected:
+                del self.files[name]
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return downscale(image)
+        return image
+
+    def clean(self):
+        for name, error in self.rejected.items():
+            self.add_error(name, error)
+        return super().clean()
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,155 @@
+"""Двухуровневый кэш групп по slug и авторов по username.
+
+Первый уровень - ограниченный LRU в памяти процесса, второй - общий кэш.
+Сигнал об изменении строки сбрасывает оба уровня в своём процессе и
+дописывает ключ в журнал сбросов в общем кэше. Остальные процессы читают
+журнал не чаще раза в LOOKUPS_SYNC_INTERVAL секунд и выбрасывают из
+первого уровня перечисленные в нём ключи. Строка живёт в первом уровне
+не дольше LOOKUPS_L1_MAX_AGE секунд, так что потерянный сброс не держит
+устаревшее значение вечно.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import Group
+
+User = get_user_model()
+
+SEQ_KEY = 'posts:lookups:seq'
+# Сколько последних сбросов хранится в журнале; кто отстал сильнее,
+# очищает первый уровень целиком
+LOG_LENGTH = 1000
+
+
+def _log_key(number):
+    return f'posts:lookups:log:{number}'
+
+
+class TwoTierCache:
+    def __init__(self, size):
+        self.size = size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = None
+        self._synced = 0
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced < settings.LOOKUPS_SYNC_INTERVAL:
+            return
+        self._synced = now
+        seq = cache.get(SEQ_KEY)
+        if seq is None:
+            cache.add(SEQ_KEY, 0, None)
+            seq = cache.get(SEQ_KEY, 0)
+        if seq == self._seq:
+            return
+        dropped = None
+        if self._seq is not None and 0 < seq - self._seq <= LOG_LENGTH:
+            keys = [_log_key(n) for n in range(self._seq + 1, seq + 1)]
+            found = cache.get_many(keys)
+            if len(found) == len(keys):
+                dropped = found.values()
+        with self._lock:
+            if dropped is None:
+                self._local.clear()
+            for key in dropped or ():
+                self._local.pop(key, None)
+            self._seq = seq
+
+    def get(self, key, load):
+        """Значение из памяти, из общего кэша или от load().
+
+        Отсутствие строки (None) не кэшируется.
+        """
+        self._sync()
+        now = time.monotonic()
+        with self._lock:
+            if key in self._local:
+                value, loaded = self._local[key]
+                if now - loaded < settings.LOOKUPS_L1_MAX_AGE:
+                    self._local.move_to_end(key)
+                    return value
+                del self._local[key]
+        value = cache.get(f'posts:lookups:{key}')
+        if value is None:
+            value = load()
+            if value is None:
+                return None
+            cache.set(
+                f'posts:lookups:{key}', value, settings.LOOKUPS_TIMEOUT
+            )
+        with self._lock:
+            self._local[key] = (value, now)
+            if len(self._local) > self.size:
+                self._local.popitem(last=False)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        cache.delete_many([f'posts:lookups:{key}' for key in keys])
+        for key in keys:
+            try:
+                number = cache.incr(SEQ_KEY)
+            except ValueError:
+                cache.add(SEQ_KEY, 0, None)
+                number = cache.incr(SEQ_KEY)
+            cache.set(_log_key(number), key, settings.LOOKUPS_TIMEOUT)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+            self._seq = None
+
+
+_tiers = TwoTierCache(settings.LOOKUPS_L1_SIZE)
+
+
+def invalidate_groups(*slugs):
+    _tiers.invalidate(*(f'group:{slug}' for slug in slugs))
+
+
+def invalidate_users(*usernames):
+    _tiers.invalidate(*(f'user:{name}' for name in usernames))
+
+
+def clear_local():
+    _tiers.clear_local()
+
+
+def get_group(slug):
+    return _tiers.get(
+        f'group:{slug}', lambda: Group.objects.filter(slug=slug).first()
+    )
+
+
+def get_user(username):
+    # Хеш пароля и прочие поля в общий кэш не попадают
+    return _tiers.get(
+        f'user:{username}',
+        lambda: User.objects.only(
+            'username', 'first_name', 'last_name'
+        ).filter(username=username).first(),
+    )
+
+
+def group_or_404(slug):
+    group = get_group(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def user_or_404(username):
+    user = get_user(username)
+    if user is None:
+        raise Http404('Пользователь не найден')
+    return user
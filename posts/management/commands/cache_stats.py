@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import singleflight
+
+
+class Command(BaseCommand):
+    help = ('Показывает, сколько пересчётов кэша выполнено и сколько '
+            'удалось избежать')
+
+    def handle(self, *args, **options):
+        for name, value in singleflight.stats().items():
+            self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,43 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает записи и комментарии автора в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='ndjson'
+        )
+        parser.add_argument(
+            '--zip', action='store_true', help='Архив вместе с картинками'
+        )
+        parser.add_argument(
+            '-o', '--output', help='Файл выгрузки; по умолчанию stdout'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = get_user_model().objects.get(
+                username=options['username']
+            )
+        except get_user_model().DoesNotExist:
+            raise CommandError('Пользователь не найден')
+        content = (export.stream_zip if options['zip'] else export.stream)(
+            author, options['format']
+        )
+        if options['output']:
+            output = open(options['output'], 'wb')
+        else:
+            output = sys.stdout.buffer
+        try:
+            for chunk in content:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,143 @@
+import random
+from array import array
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from posts import bulk_import
+from posts.models import Comment, Post
+
+WORDS = ('котик', 'собака', 'утро', 'кофе', 'город', 'дождь', 'книга',
+         'прогулка', 'море', 'работа', 'друзья', 'музыка', 'вечер', 'лес')
+# Даты отсчитываются от постоянного момента, а не от текущего времени,
+# иначе один seed давал бы разные данные
+NOW = '2024-01-01T00:00:00+00:00'
+
+
+def zipf_weights(count, alpha):
+    """Накопленные веса 1/rank^alpha для random.choices."""
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетические данные: авторов с записями по степенному '
+            'закону, комментарии и перекошенный граф подписок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона: больше - сильнее перекос',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты записей',
+        )
+        parser.add_argument(
+            '--now', default=NOW,
+            help='Момент, от которого отсчитываются даты записей',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.options = options
+        try:
+            self.now = bulk_import.parse_date(options['now'])
+        except ValueError as error:
+            raise CommandError(error)
+        # Возраст каждой записи в секундах: комментарии не старше записей
+        self.ages = array('L')
+        self.authors = zipf_weights(options['users'], options['alpha'])
+        importer = bulk_import.Importer(options['batch_size'])
+        first_post = (Post.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        first_comment = (
+            Comment.objects.aggregate(last=Max('pk'))['last'] or 0
+        ) + 1
+        importer.load('users', self.users())
+        importer.load('groups', self.groups())
+        importer.load('posts', self.posts(first_post))
+        importer.load('comments', self.comments(first_post, first_comment))
+        importer.load('follows', self.follows())
+        importer.finish()
+        for kind in bulk_import.KINDS:
+            self.stdout.write(f'{kind}: {importer.created[kind]}')
+
+    def username(self, number):
+        return f'user{number}'
+
+    def author(self):
+        return self.username(self.random.choices(
+            range(self.options['users']), cum_weights=self.authors
+        )[0])
+
+    def text(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words))
+
+    def users(self):
+        # Все зарегистрированы до самой старой записи
+        joined = self.now - timedelta(days=self.options['days'])
+        for number in range(self.options['users']):
+            yield {'username': self.username(number),
+                   'first_name': f'Имя{number}',
+                   'date_joined': joined.isoformat()}
+
+    def groups(self):
+        for number in range(self.options['groups']):
+            yield {'slug': f'group{number}', 'title': f'Группа {number}',
+                   'description': self.text(10)}
+
+    def posts(self, first):
+        seconds = self.options['days'] * 24 * 60 * 60
+        groups = self.options['groups']
+        for number in range(self.options['posts']):
+            age = self.random.randrange(seconds)
+            self.ages.append(age)
+            pub_date = self.now - timedelta(seconds=age)
+            group = self.random.randrange(groups * 2) if groups else groups
+            yield {
+                'id': first + number,
+                'author': self.author(),
+                # Половина записей без группы
+                'group': f'group{group}' if group < groups else None,
+                'text': self.text(self.random.randint(5, 60)),
+                'pub_date': pub_date.isoformat(),
+            }
+
+    def comments(self, first_post, first):
+        posts = self.options['posts']
+        if not posts:
+            return
+        # Немногие записи собирают большую часть комментариев
+        weights = zipf_weights(posts, 1.0)
+        for number in range(self.options['comments']):
+            post = self.random.choices(
+                range(posts), cum_weights=weights
+            )[0]
+            age = self.random.randrange(self.ages[post] + 1)
+            yield {
+                'id': first + number,
+                'post': first_post + post,
+                'author': self.username(
+                    self.random.randrange(self.options['users'])
+                ),
+                'text': self.text(self.random.randint(1, 8))[:80],
+                'created': (self.now - timedelta(seconds=age)).isoformat(),
+            }
+
+    def follows(self):
+        # Подписываются все понемногу, а на популярных авторов - многие
+        for _ in range(self.options['follows']):
+            yield {
+                'user': self.username(
+                    self.random.randrange(self.options['users'])
+                ),
+                'author': self.author(),
+            }
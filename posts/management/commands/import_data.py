@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk_import
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, записи, комментарии и '
+            'подписки из JSONL или CSV и пересчитывает производные данные')
+
+    def add_arguments(self, parser):
+        for kind in bulk_import.KINDS:
+            parser.add_argument(
+                f'--{kind}', metavar='FILE',
+                help=f'Файл {kind}.jsonl или {kind}.csv; - для stdin',
+            )
+        parser.add_argument('--format', choices=('jsonl', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        importer = bulk_import.Importer(
+            options['batch_size'],
+            log=lambda message: self.stderr.write(
+                f'[{time.monotonic() - started:.0f} с] {message}'
+            ) if options['verbosity'] > 1 else None,
+            report=lambda message: self.stderr.write(
+                f'Пропущено: {message}'
+            ),
+        )
+        for kind in bulk_import.KINDS:
+            if options[kind]:
+                importer.load(kind, bulk_import.read_rows(
+                    options[kind], options['format']
+                ))
+        importer.finish()
+        for kind in bulk_import.KINDS:
+            if options[kind]:
+                self.stdout.write(
+                    f'{kind}: загружено {importer.created[kind]}, '
+                    f'пропущено {importer.skipped[kind]}'
+                )
+        self.stdout.write(f'Время: {time.monotonic() - started:.1f} с')
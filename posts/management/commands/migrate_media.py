@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import caching, media
+from posts.models import Post
+from posts.storage import is_hashed, post_images
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки записей со старыми именами '
+            'в хранилище по содержимому')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько имён читать и переносить одной транзакцией',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True).distinct().order_by('image')
+        moved = missing = 0
+        batch_size = options['batch_size']
+        last = ''
+        # Имена читаются пачками по ключу: в памяти только одна пачка
+        while True:
+            batch = list(names.filter(image__gt=last)[:batch_size])
+            if not batch:
+                break
+            last = batch[-1]
+            legacy = []
+            for name in batch:
+                if is_hashed(name):
+                    continue
+                if not post_images.exists(name):
+                    missing += 1
+                    self.stderr.write(f'Файл не найден: {name}')
+                    continue
+                legacy.append(name)
+            self._move(legacy)
+            moved += len(legacy)
+        self.stdout.write(
+            f'Перенесено картинок: {moved}, не найдено: {missing}. '
+            'Миниатюры для новых имён строит warm_thumbnails'
+        )
+
+    def _move(self, names):
+        # Сначала копии, потом записи одной транзакцией на пачку, и
+        # только после фиксации - удаление оригиналов: сбой на любом
+        # шаге не оставит записи без файла
+        hashed = {name: post_images.adopt(name) for name in names}
+        changed = []
+        with transaction.atomic():
+            for name, new_name in hashed.items():
+                posts = list(Post.objects.filter(image=name).only(
+                    'author_id', 'group_id'
+                ))
+                Post.objects.filter(image=name).update(
+                    image=new_name, updated=timezone.now()
+                )
+                media.acquire(new_name, len(posts))
+                transaction.on_commit(
+                    lambda name=name: post_images.delete(name)
+                )
+                changed.extend(posts)
+        for post in changed:
+            caching.post_changed(post, post.group_id)
+            caching.bump(*caching.post_scopes(post))
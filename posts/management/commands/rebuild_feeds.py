@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='usernames', action='append', default=[],
+            help='Пересобрать ленту только этого пользователя',
+        )
+
+    def handle(self, *args, **options):
+        if not options['usernames']:
+            entries = feeds.rebuild_all()
+            self.stdout.write(f'Записей во всех лентах: {entries}')
+            return
+        user_ids = User.objects.filter(
+            username__in=options['usernames']
+        ).values_list('id', flat=True)
+        count = 0
+        for user_id in user_ids.iterator():
+            feeds.rebuild(user_id)
+            count += 1
+        self.stdout.write(f'Пересобрано лент: {count}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Исправляет расхождения денормализованных счётчиков с данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = counters.reconcile_users(batch_size)
+        posts = counters.reconcile_posts(batch_size)
+        self.stdout.write(
+            f'Исправлено счётчиков: пользователей {users}, записей {posts}'
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает авторов, чьи записи подтягиваются в ленты '
+            'при чтении; удобно запускать по расписанию')
+
+    def handle(self, *args, **options):
+        authors = feeds.refresh_pull_authors()
+        self.stdout.write(f'Популярных авторов: {len(authors)}')
@@ -0,0 +1,45 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.queue import enqueue_many
+from posts.models import ImageVariants, Post
+
+
+class Command(BaseCommand):
+    help = ('Ставит в очередь задач построение миниатюр для уже '
+            'загруженных картинок записей; строит их run_jobs')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить и те картинки, у которых миниатюры уже есть',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько задач ставить в очередь одной транзакцией',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).order_by().values_list('image', flat=True).distinct()
+        if not options['all']:
+            names = names.exclude(
+                image__in=ImageVariants.objects.values('name')
+            )
+        names = names.iterator(chunk_size=batch_size)
+        queued = 0
+        # Каждая пачка фиксируется отдельно, чтобы не держать запись
+        # в базу на всё время обхода
+        while True:
+            batch = list(islice(names, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                queued += enqueue_many(
+                    'posts.generate_thumbnails', ([name] for name in batch)
+                )
+        self.stdout.write(f'Поставлено в очередь картинок: {queued}')
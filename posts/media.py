@@ -0,0 +1,62 @@
+"""Счётчики ссылок на картинки в хранилище по содержимому.
+
+Одинаковые загрузки делят один файл; файл и его миниатюры удаляются,
+когда на него не ссылается ни одна запись. Файлы со старыми именами
+(до migrate_media) здесь не учитываются и не удаляются.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from . import thumbnails
+from .models import MediaFile, Post
+from .storage import is_hashed, post_images
+
+
+def acquire(name, count=1):
+    if not is_hashed(name):
+        return
+    updated = MediaFile.objects.filter(name=name).update(
+        refs=F('refs') + count
+    )
+    if not updated:
+        MediaFile.objects.get_or_create(name=name)
+        MediaFile.objects.filter(name=name).update(refs=F('refs') + count)
+    # Строка счётчика уже заблокирована, и _remove не начнёт удалять.
+    # Если же он успел удалить файл после того, как загрузка нашла его
+    # на месте, запись ссылалась бы на пустоту: откатываем транзакцию.
+    if not post_images.exists(name):
+        raise FileNotFoundError(f'Файл {name} удалён во время загрузки')
+
+
+def release(name):
+    if not is_hashed(name):
+        return
+    MediaFile.objects.filter(name=name).update(refs=F('refs') - 1)
+    transaction.on_commit(lambda: _remove(name))
+
+
+def _remove(name):
+    # Проверка счётчика и удаление файла - под одной блокировкой:
+    # acquire из параллельной загрузки дождётся конца транзакции
+    with transaction.atomic():
+        if not MediaFile.objects.filter(name=name, refs__lte=0).delete()[0]:
+            return
+        # Удаляет и сам файл, и миниатюры, известные sorl
+        delete_thumbnails(ImageFile(name, post_images))
+    thumbnails.forget(name)
+
+
+def recount():
+    """Пересчитывает ссылки по записям, например после bulk_create."""
+    counts = Post.objects.exclude(image='').exclude(
+        image__isnull=True
+    ).order_by().values_list('image').annotate(total=Count('pk'))
+    with transaction.atomic():
+        MediaFile.objects.all().delete()
+        MediaFile.objects.bulk_create(
+            (MediaFile(name=name, refs=total)
+             for name, total in counts.iterator() if is_hashed(name)),
+            batch_size=1000,
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def mark_pulled(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    authors = Follow.objects.values('author_id').annotate(
+        followers=Count('id')
+    ).filter(
+        followers__gte=settings.FEED_PULL_THRESHOLD
+    ).values_list('author_id', flat=True)
+    UserStats.objects.filter(user_id__in=list(authors)).update(pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='pulled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
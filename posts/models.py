@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import post_images
+
 User = get_user_model()
 
 
@@ -13,12 +15,19 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Всё, что выводит карточка post_item.html, одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Давай, напиши что-нибудь интересное'
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='posts'
     )
@@ -30,12 +39,29 @@ class Post(models.Model):
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=post_images,
         blank=True, null=True,
         verbose_name='Картинка',
     )
+    comments_count = models.IntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -53,6 +79,12 @@ class Comment(models.Model):
     text = models.TextField('Текст комментария', max_length=80)
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Для иерархии дат в админке
+        indexes = [
+            models.Index(fields=['-created'], name='comment_created_idx'),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -61,3 +93,52 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='following'
     )
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.IntegerField(default=0)
+    followers_count = models.IntegerField(default=0)
+    followings_count = models.IntegerField(default=0)
+    # Записи автора не раскладываются по лентам, а подтягиваются при чтении
+    pulled = models.BooleanField(default=False)
+
+
+class MediaFile(models.Model):
+    """Число записей, ссылающихся на файл из хранилища по содержимому."""
+    name = models.CharField(max_length=255, primary_key=True)
+    refs = models.IntegerField(default=0)
+
+
+class ImageVariants(models.Model):
+    """Готовые миниатюры картинки: geometry -> [имя, url, ширина, высота]."""
+    name = models.CharField(max_length=255, primary_key=True)
+    variants = models.TextField()
@@ -0,0 +1,158 @@
+import heapq
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import lazy
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import caching
+
+NEXT = 'n'
+PREVIOUS = 'p'
+KEY = ('pub_date', 'id')
+
+
+def encode_cursor(direction, post):
+    return encode_key(direction, post.pub_date, post.pk)
+
+
+def encode_key(direction, pub_date, pk):
+    value = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(token):
+    """Возвращает (direction, pub_date, pk) или None для битого курсора."""
+    try:
+        direction, pub_date, pk = force_text(
+            urlsafe_base64_decode(token)
+        ).split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты, выбранная по ключу (pub_date, id) без OFFSET."""
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset(queryset, direction, pub_date, pk, fields=KEY):
+    """Отбирает записи строго после (NEXT) или до (PREVIOUS) курсора."""
+    date, pk_field = fields
+    if direction == NEXT:
+        return queryset.filter(
+            Q(**{f'{date}__lt': pub_date})
+            | Q(**{date: pub_date, f'{pk_field}__lt': pk})
+        ).order_by(f'-{date}', f'-{pk_field}')
+    return queryset.filter(
+        Q(**{f'{date}__gt': pub_date})
+        | Q(**{date: pub_date, f'{pk_field}__gt': pk})
+    ).order_by(date, pk_field)
+
+
+def ordered(source, cursor=None):
+    """Источник ленты по убыванию ключа, начиная с курсора.
+
+    Ключ - (pub_date, id). Источник, явно упорядоченный по двум другим
+    полям с теми же значениями, листается по ним: так разложенная лента
+    (feeds.feed_sources) идёт по индексу FeedEntry.
+    """
+    fields = KEY
+    if len(source.query.order_by) == 2:
+        fields = tuple(field.lstrip('-') for field in source.query.order_by)
+    if cursor is None:
+        return source.order_by(*(f'-{field}' for field in fields))
+    return keyset(source, *cursor, fields=fields)
+
+
+def _fetch(source, per_page, cursor):
+    return list(ordered(source, cursor)[:per_page + 1])
+
+
+def merge(streams, descending=True):
+    """k-way слияние упорядоченных потоков записей без дублей."""
+    merged = heapq.merge(
+        *streams, key=lambda post: (post.pub_date, post.pk),
+        reverse=descending,
+    )
+    last_pk = None
+    for post in merged:
+        if post.pk != last_pk:
+            last_pk = post.pk
+            yield post
+
+
+def cursor_page(queryset, per_page, cursor=None, pulled=()):
+    """Страница по курсору; pulled - дополнительные источники для слияния."""
+    paginator = Paginator(queryset, per_page)
+    direction = NEXT if cursor is None else cursor[0]
+    streams = [
+        _fetch(source, per_page, cursor) for source in (queryset, *pulled)
+    ]
+    posts = list(merge(streams, descending=direction == NEXT))
+    has_more = len(posts) > per_page
+    if direction == PREVIOUS and not has_more:
+        # Дошли до начала ленты: отдаём полноценную первую страницу.
+        return cursor_page(queryset, per_page, pulled=pulled)
+    posts = posts[:per_page]
+    if direction == PREVIOUS:
+        posts.reverse()
+    page = CursorPage(posts, paginator)
+    if posts and (has_more or direction == PREVIOUS):
+        page.next_cursor = encode_cursor(NEXT, posts[-1])
+    if posts and cursor is not None:
+        page.previous_cursor = encode_cursor(PREVIOUS, posts[0])
+    return page
+
+
+def paginate(request, queryset, per_page, pulled=(), head=None):
+    """Курсорная пагинация с поддержкой старых ссылок вида ?page=N.
+
+    Без параметров и с ?page= возвращается обычная Page, которой
+    дополнительно выставлены ленивые курсоры соседних страниц: записи
+    выбираются, только если курсор действительно выводится. Ленты,
+    собранные из нескольких источников (pulled), листаются только курсором.
+    Первые страницы лент с областью head собираются из кэша списков id.
+    """
+    token = request.GET.get('cursor')
+    cursor = decode_cursor(token) if token else None
+    if cursor is not None or pulled:
+        return cursor_page(queryset, per_page, cursor, pulled)
+    paginator = Paginator(queryset, per_page)
+    page = None
+    if head is not None:
+        page = caching.head_page(paginator, request.GET.get('page'), head)
+    if page is None:
+        page = paginator.get_page(request.GET.get('page'))
+    page.next_cursor = lazy(_page_cursor, str)(page, NEXT)
+    page.previous_cursor = lazy(_page_cursor, str)(page, PREVIOUS)
+    return page
+
+
+def _page_cursor(page, direction):
+    if direction == NEXT and page.has_next():
+        return encode_cursor(NEXT, page[len(page) - 1])
+    if direction == PREVIOUS and page.has_previous():
+        return encode_cursor(PREVIOUS, page[0])
+    return ''
@@ -0,0 +1,122 @@
+"""Полнотекстовый поиск по записям через таблицу FTS5 posts_post_fts.
+
+Индекс поддерживают триггеры из миграции 0013. Результаты упорядочены
+по bm25 и листаются курсором (rank, id). Вне SQLite поиск работает
+через icontains.
+"""
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.encoding import force_bytes, force_text
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import caching
+from .models import Post
+from .paginators import CursorPage
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_query(text):
+    """Запрос MATCH из слов пользователя; операторы FTS5 экранируются."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def encode_cursor(rank, pk):
+    return urlsafe_base64_encode(force_bytes(f'{rank!r}|{pk}'))
+
+
+def decode_cursor(token):
+    try:
+        rank, pk = force_text(urlsafe_base64_decode(token)).split('|')
+        return float(rank), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def filter_posts(queryset, text):
+    """Оставляет в queryset записи, подходящие под запрос."""
+    match = match_query(text)
+    if not match:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=text)
+    # Не pk__in=RawSQL(...): Django берёт подзапрос в двойные скобки, и
+    # SQLite сравнивает pk только с первой строкой подзапроса
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    return queryset.extra(
+        where=[f'{table}.rowid IN (SELECT rowid FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s)'],
+        params=[match],
+    )
+
+
+def _ranked(match, per_page, cursor):
+    sql = f'SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    params = [match]
+    if cursor is not None:
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [cursor[0], cursor[0], cursor[1]]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    with connection.cursor() as db:
+        db.execute(sql, params + [per_page + 1])
+        return db.fetchall()
+
+
+def search_page(text, per_page, token=None):
+    """Страница результатов поиска, самые подходящие записи первыми."""
+    cursor = decode_cursor(token) if token else None
+    match = match_query(text)
+    rows = []
+    if match and available():
+        rows = _ranked(match, per_page, cursor)
+    elif match:
+        queryset = Post.objects.filter(text__icontains=text).order_by('pk')
+        if cursor is not None:
+            queryset = queryset.filter(pk__gt=cursor[1])
+        rows = [
+            (pk, 0.0)
+            for pk in queryset.values_list('pk', flat=True)[:per_page + 1]
+        ]
+    page = CursorPage(
+        caching.get_posts([pk for pk, _ in rows[:per_page]]),
+        Paginator([], per_page),
+    )
+    if len(rows) > per_page:
+        pk, rank = rows[per_page - 1]
+        page.next_cursor = encode_cursor(rank, pk)
+    return page
+
+
+def rebuild(batch_size):
+    """Заново строит индекс пачками по batch_size записей.
+
+    Возвращает число проиндексированных записей.
+    """
+    with connection.cursor() as db:
+        db.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')"
+        )
+        last_pk = 0
+        total = 0
+        while True:
+            db.execute(
+                'SELECT MAX(id) FROM (SELECT id FROM posts_post '
+                'WHERE id > %s ORDER BY id LIMIT %s)',
+                [last_pk, batch_size],
+            )
+            upper = db.fetchone()[0]
+            if upper is None:
+                return total
+            db.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                'SELECT id, text FROM posts_post WHERE id > %s AND id <= %s',
+                [last_pk, upper],
+            )
+            total += db.rowcount
+            last_pk = upper
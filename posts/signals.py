@@ -0,0 +1,148 @@
+from copy import copy
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import caching, counters, feeds, lookups, media
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def _after_commit(func, *args):
+    # Кэш сбрасывается только после фиксации: иначе параллельный запрос
+    # успеет прочитать новое поколение, но старые строки, и сохранит их
+    # под новым ключом
+    transaction.on_commit(lambda: func(*args))
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._old_group_id = None
+    instance._old_image = None
+    if instance.pk is not None:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group_id = getattr(instance, '_old_group_id', None)
+    _after_commit(caching.bump,
+                  *caching.post_scopes(instance, old_group_id))
+    if created:
+        _after_commit(caching.post_created, instance)
+        counters.bump_user(instance.author_id, posts_count=1)
+        feeds.fan_out(instance)
+    else:
+        _after_commit(caching.post_changed, instance, old_group_id)
+    old_image = getattr(instance, '_old_image', None)
+    if instance.image.name != old_image:
+        media.acquire(instance.image.name)
+        media.release(old_image)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _after_commit(caching.bump, *caching.post_scopes(instance))
+    # После удаления у экземпляра обнулится pk, а ключ нужен по нему
+    _after_commit(caching.post_removed, copy(instance))
+    counters.bump_user(instance.author_id, posts_count=-1)
+    media.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        post = instance.post
+        _after_commit(caching.bump, *caching.post_scopes(post))
+        _after_commit(caching.post_changed, post, post.group_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        _after_commit(caching.bump, *caching.post_scopes(post))
+        _after_commit(caching.post_changed, post, post.group_id)
+
+
+def _old_value(instance, field):
+    if instance.pk is None:
+        return None
+    return type(instance).objects.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first()
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, **kwargs):
+    instance._old_slug = _old_value(instance, 'slug')
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    _after_commit(caching.bump, 'index', 'groups', f'group:{instance.pk}')
+    # Записи читаются сейчас: после удаления группы их group_id обнулён
+    _after_commit(caching.drop_posts, list(Post.objects.filter(
+        group=instance
+    ).values_list('pk', flat=True)))
+    slugs = {instance.slug, getattr(instance, '_old_slug', None)} - {None}
+    _after_commit(lookups.invalidate_groups, *slugs)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    _after_commit(caching.bump, f'author:{instance.user_id}',
+                  f'author:{instance.author_id}')
+    if created:
+        counters.bump_user(instance.user_id, followings_count=1)
+        counters.bump_user(instance.author_id, followers_count=1)
+        feeds.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    _after_commit(caching.bump, f'author:{instance.user_id}',
+                  f'author:{instance.author_id}')
+    counters.bump_user(instance.user_id, followings_count=-1)
+    counters.bump_user(instance.author_id, followers_count=-1)
+    feeds.prune(instance.user_id, instance.author_id)
+
+
+# Поля пользователя, которые попадают в закэшированные карточки записей
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    instance._old_author = None
+    if instance.pk is not None and update_fields != frozenset({'last_login'}):
+        instance._old_author = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_saved(sender, instance, created=False, update_fields=None,
+               **kwargs):
+    # Вход пользователя обновляет только last_login, страницу он не меняет.
+    if update_fields == frozenset({'last_login'}):
+        return
+    if not created:
+        _after_commit(caching.bump, f'author:{instance.pk}')
+    old = getattr(instance, '_old_author', None)
+    if old is not None and old != tuple(
+        getattr(instance, field) for field in AUTHOR_FIELDS
+    ):
+        _after_commit(caching.author_changed, instance)
+    names = {instance.username, old[0] if old else None}
+    _after_commit(lookups.invalidate_users, *(names - {None}))
@@ -0,0 +1,93 @@
+"""Защита дорогих кэшируемых значений от лавины пересчётов.
+
+Значение хранится вместе со временем своего вычисления и мягким сроком
+годности. Пересчитывает его только тот, кто взял ключ-замок, остальные
+в это время получают устаревшее значение. Незадолго до истечения срока
+пересчёт запускается заранее с вероятностью, растущей к концу срока
+(алгоритм XFetch), так что к моменту истечения значение обычно свежее.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+STATS = ('recomputed', 'early_refreshed', 'stale_served', 'waited')
+
+
+def _incr(cache, name):
+    key = f'singleflight:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def stats(using='default'):
+    cache = caches[using]
+    found = cache.get_many([f'singleflight:stats:{name}' for name in STATS])
+    return {
+        name: found.get(f'singleflight:stats:{name}', 0) for name in STATS
+    }
+
+
+def _compute(cache, key, compute, timeout):
+    started = time.time()
+    value = compute()
+    delta = time.time() - started
+    if timeout is None:
+        cache.set(key, (value, delta, math.inf), None)
+        return value
+    # Жёсткий срок дольше мягкого: устаревшее значение нужно отдавать,
+    # пока кто-то один его пересчитывает.
+    cache.set(
+        key,
+        (value, delta, time.time() + timeout),
+        timeout + settings.SINGLEFLIGHT_STALE_TTL,
+    )
+    return value
+
+
+def get_or_set(key, compute, timeout, using='default'):
+    """Возвращает значение ключа, вычисляя его compute() не более одного раза.
+
+    Годится и для представлений, и для шаблонного тега cache из
+    библиотеки singleflight.
+    """
+    cache = caches[using]
+    key = f'singleflight:{key}'
+    lock = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires = entry
+        now = time.time()
+        early = delta * settings.SINGLEFLIGHT_BETA * -math.log(
+            1.0 - random.random()
+        )
+        if now + early < expires:
+            return value
+        if not cache.add(lock, 1, settings.SINGLEFLIGHT_LOCK_TIMEOUT):
+            _incr(cache, 'stale_served')
+            return value
+        _incr(cache, 'early_refreshed' if now < expires else 'recomputed')
+        try:
+            return _compute(cache, key, compute, timeout)
+        finally:
+            cache.delete(lock)
+    if not cache.add(lock, 1, settings.SINGLEFLIGHT_LOCK_TIMEOUT):
+        # Значения ещё нет, а его уже считают: ждём немного, а не считаем
+        # второй раз.
+        deadline = time.time() + settings.SINGLEFLIGHT_WAIT
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                _incr(cache, 'waited')
+                return entry[0]
+    _incr(cache, 'recomputed')
+    try:
+        return _compute(cache, key, compute, timeout)
+    finally:
+        cache.delete(lock)
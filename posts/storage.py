@@ -0,0 +1,79 @@
+"""Хранилище картинок, адресуемое содержимым.
+
+Имя файла - SHA-256 его содержимого, разложенное по вложенным каталогам
+(posts/ab/cd/abcd....jpg), чтобы в одном каталоге не копились миллионы
+файлов. Одинаковые картинки сохраняются один раз; сколько записей
+ссылается на файл, считает posts.media.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(
+    r'^(?:.+/)?[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$'
+)
+
+
+def is_hashed(name):
+    return bool(name) and HASHED_NAME.match(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно будет выбрано по содержимому в _save
+        return name
+
+    def hashed_name(self, name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        ).replace('\\', '/')
+
+    def _save(self, name, content):
+        # Пишем во временный файл, попутно считая хеш, и атомарно
+        # переименовываем: одинаковое содержимое даёт одинаковый файл,
+        # поэтому гонка двух загрузок ничего не портит.
+        directory = self.path(os.path.dirname(name) or '.')
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            name = self.hashed_name(name, digest.hexdigest())
+            self._place(temporary, name)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return name
+
+    def _place(self, source, name):
+        path = self.path(name)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(source, self.file_permissions_mode)
+        os.replace(source, path)
+
+    def adopt(self, name):
+        """Копирует существующий файл под имя по содержимому.
+
+        Возвращает новое имя. Оригинал остаётся на месте: удалить его
+        можно, только когда записи уже ссылаются на копию.
+        """
+        with self.open(name) as source:
+            return self._save(name, source)
+
+
+post_images = ContentAddressedStorage()
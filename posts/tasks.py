@@ -0,0 +1,20 @@
+from jobs.queue import task
+
+from . import counters, feeds, thumbnails
+
+
+@task(max_attempts=3)
+def generate_thumbnails(name):
+    if not thumbnails.generate(name):
+        raise RuntimeError(f'Не удалось создать миниатюры для {name}')
+
+
+@task()
+def refresh_feed_authors():
+    feeds.refresh_pull_authors()
+
+
+@task(priority=-1)
+def reconcile_counters(batch_size=1000):
+    counters.reconcile_users(batch_size)
+    counters.reconcile_posts(batch_size)
@@ -0,0 +1,20 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+def _found(context, image):
+    # Списки передают в контексте thumbnails все миниатюры страницы,
+    # найденные одним запросом; тогда отдельного поиска нет.
+    found = context.get('thumbnails')
+    if found is None:
+        found = thumbnails.ready_many([image])
+    return found
+
+
+@register.simple_tag(takes_context=True)
+def post_picture(context, image):
+    """Варианты картинки карточки для <picture> или None."""
+    return thumbnails.picture(image, _found(context, image))
@@ -0,0 +1,52 @@
+"""Замена тега {% cache %}, пересчитывающая фрагмент в один поток.
+
+Синтаксис тот же: {% load singleflight %} {% cache 600 name var %}.
+"""
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode, do_cache
+
+from .. import singleflight
+
+register = template.Library()
+
+
+class SingleFlightCacheNode(CacheNode):
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                f'"cache" tag got an unknown variable: '
+                f'{self.expire_time_var.var!r}'
+            )
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"cache" tag got a non-integer timeout value: '
+                    f'{expire_time!r}'
+                )
+        using = 'default'
+        if self.cache_name:
+            using = self.cache_name.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return singleflight.get_or_set(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            using=using,
+        )
+
+
+@register.tag('cache')
+def do_singleflight_cache(parser, token):
+    node = do_cache(parser, token)
+    return SingleFlightCacheNode(
+        node.nodelist,
+        node.expire_time_var,
+        node.fragment_name,
+        node.vary_on,
+        node.cache_name,
+    )
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.admin_client = Client()
+        cls.admin_client.force_login(cls.admin)
+
+    def add_rows(self, count):
+        User = get_user_model()
+        for i in range(count):
+            author = User.objects.create(
+                username=f'author{User.objects.count()}'
+            )
+            post = Post.objects.create(
+                text='Текст', author=author, group=self.group
+            )
+            Comment.objects.create(post=post, author=author, text='К')
+            Follow.objects.create(user=self.admin, author=author)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        urls = [
+            reverse(f'admin:posts_{model}_changelist')
+            for model in ('post', 'comment', 'follow')
+        ]
+        self.add_rows(1)
+        small = {url: self.count_queries(url) for url in urls}
+        self.add_rows(10)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_queries(url),
+                    small[url],
+                    'Число запросов списка растёт вместе с числом строк'
+                )
+
+    def test_count_is_cached(self):
+        self.add_rows(3)
+        url = reverse('admin:posts_post_changelist')
+        self.admin_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertFalse(
+            [q for q in queries if 'COUNT(' in q['sql']],
+            'Число строк пересчитывается при каждом открытии списка'
+        )
+
+    def test_no_date_scan(self):
+        self.add_rows(2)
+        for model in ('post', 'comment'):
+            url = reverse(f'admin:posts_{model}_changelist')
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.admin_client.get(url)
+                self.assertFalse(
+                    [q for q in queries if 'DISTINCT' in q['sql']],
+                    'Даты для навигации выбираются из всей таблицы'
+                )
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username='Test')
+        cls.author = User.objects.create(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Запись {number}', author=cls.author,
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(15)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.guest_client = Client()
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def get(self, url, client=None, **params):
+        response = (client or self.guest_client).get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response
+
+    def test_index_pages_by_cursor(self):
+        data = self.get(reverse('api:index')).json()
+        self.assertEqual(
+            [item['text'] for item in data['results']],
+            [f'Запись {number}' for number in range(14, 4, -1)],
+        )
+        self.assertEqual(
+            set(data['results'][0]),
+            {'id', 'text', 'pub_date', 'author', 'group', 'image',
+             'comments_count'},
+        )
+        self.assertEqual(data['results'][0]['author'], 'Author')
+        rest = self.guest_client.get(data['next']).json()
+        self.assertEqual(len(rest['results']), 5)
+        self.assertIsNone(rest['next'], 'Курсор после последней страницы')
+
+    def test_sparse_fields(self):
+        data = self.get(reverse('api:index'), fields='id,text').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertIn('fields=id%2Ctext', data['next'])
+        response = self.get(reverse('api:index'), fields='id,password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_group_and_profile(self):
+        data = self.get(
+            reverse('api:group_posts', kwargs={'slug': 'group'}), limit=100
+        ).json()
+        self.assertEqual(len(data['results']), 7)
+        self.assertEqual({item['group'] for item in data['results']},
+                         {'group'})
+        data = self.get(
+            reverse('api:profile', kwargs={'username': 'Test'})
+        ).json()
+        self.assertEqual(data['results'], [])
+        response = self.get(
+            reverse('api:group_posts', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_with_comments(self):
+        post = self.posts[0]
+        data = self.get(reverse('api:post', kwargs={
+            'username': 'Author', 'post_id': post.pk
+        })).json()
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(
+            [(item['author'], item['text']) for item in data['comments']],
+            [('Test', 'Комментарий')],
+        )
+
+    def test_follow_feed(self):
+        response = self.get(reverse('api:follow'))
+        self.assertEqual(response.status_code, 401)
+        data = self.get(
+            reverse('api:follow'), self.authorized_client
+        ).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNotNone(data['next'])
+
+    def test_index_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.get(reverse('api:index'), fields='id,author,group')
+
+    def test_bad_cursor(self):
+        response = self.get(reverse('api:index'), cursor='плохой')
+        self.assertEqual(response.status_code, 400)
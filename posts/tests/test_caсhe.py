@@ -1,9 +1,16 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
 
-from ..models import Post
+from .. import caching
+from ..models import Group, Post
 
 
+@mock.patch('django.db.transaction.on_commit', lambda func: func())
 class PostCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -11,16 +18,195 @@ class PostCreateFormTests(TestCase):
         cls.guest_client = Client()
         User = get_user_model()
         cls.user = User.objects.create(username='Test')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-group',
+            description='тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовая запись №1',
+            author=cls.user,
+            group=cls.group,
+        )
 
     def test_cashe(self):
         request_1 = self.guest_client.get('/')
-        post_new = Post.objects.create( # noqa
-            text='Тестовая запись №2',
-            author=self.user,
-        )
+        # update() не отправляет сигналы, поэтому кэш остаётся прежним
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый текст')
         request_2 = self.guest_client.get('/')
         self.assertHTMLEqual(
             str(request_1.content),
             str(request_2.content),
             'Ошибка кэширования'
         )
+
+    def test_cache_invalidation(self):
+        urls = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test-group'}),
+            reverse('profile', kwargs={'username': 'Test'}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.create(
+            text='Тестовая запись №2',
+            author=self.user,
+            group=self.group,
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url),
+                    'Тестовая запись №2',
+                    msg_prefix='Новая запись скрыта устаревшим кэшем'
+                )
+
+    def test_group_rename_invalidates_cards(self):
+        self.guest_client.get(reverse('profile', kwargs={'username': 'Test'}))
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(
+            self.guest_client.get(
+                reverse('profile', kwargs={'username': 'Test'})
+            ),
+            'Новое название'
+        )
+
+    def test_cache_is_page_aware(self):
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=self.user) for i in range(10)
+        )
+        cache.clear()
+        page_1 = self.guest_client.get('/')
+        page_2 = self.guest_client.get('/', {'page': 2})
+        self.assertNotEqual(
+            page_1.content,
+            page_2.content,
+            'Разные страницы отдаются из одного кэша'
+        )
+        self.assertContains(page_2, 'Тестовая запись №1')
+
+
+@mock.patch('django.db.transaction.on_commit', lambda func: func())
+class HeadCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username='Test')
+        cls.posts = [
+            Post.objects.create(text=f'Запись {i}', author=cls.user)
+            for i in range(12)
+        ][::-1]
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def head_page(self, number=1):
+        paginator = Paginator(Post.objects.for_listing(), 10)
+        return caching.head_page(paginator, number, 'index')
+
+    def test_page_from_cached_ids(self):
+        self.assertEqual(list(self.head_page(2)), self.posts[10:])
+        with self.assertNumQueries(0):
+            page = self.head_page(2)
+            self.assertEqual(page.paginator.count, 12)
+            self.assertEqual(list(page), self.posts[10:])
+
+    def test_new_post_refreshes_head(self):
+        self.head_page()
+        post = Post.objects.create(text='Новая запись', author=self.user)
+        page = self.head_page()
+        self.assertEqual(list(page), [post, *self.posts[:9]])
+        self.assertEqual(page.paginator.count, 13)
+        with self.assertNumQueries(0):
+            self.head_page()
+
+    def test_edit_replaces_only_post_key(self):
+        self.head_page()
+        self.authorized_client.post(
+            reverse('post_edit', kwargs={'username': 'Test',
+                                         'post_id': self.posts[0].id}),
+            {'text': 'Исправленная запись'},
+        )
+        with self.assertNumQueries(1):
+            page = self.head_page()
+        self.assertEqual(page[0].text, 'Исправленная запись')
+
+    def test_cached_post_has_only_card_fields(self):
+        self.head_page()
+        post = cache.get(caching._post_key(self.posts[0].pk))
+        self.assertEqual(post.author.username, 'Test')
+        self.assertEqual(
+            post.author.get_deferred_fields() & {'password', 'email'},
+            {'password', 'email'},
+            'В общий кэш попали пароль и почта автора'
+        )
+
+    def test_author_rename_refreshes_cards(self):
+        self.authorized_client.get(reverse('index'))
+        self.user.username = 'Renamed'
+        self.user.save()
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, '@Renamed')
+        self.assertNotContains(response, '@Test<',
+                               msg_prefix='Карточки со старым именем')
+
+    def test_deleted_post_is_removed(self):
+        self.head_page()
+        Post.objects.get(pk=self.posts[0].pk).delete()
+        page = self.head_page()
+        self.assertEqual(list(page), self.posts[1:11])
+        self.assertEqual(page.paginator.count, 11)
+
+
+class CardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='Test_author')
+        cls.reader = User.objects.create(username='Test_reader')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        self.post = Post.objects.create(text='Текст', author=self.author)
+        self.url = reverse('post', kwargs={'username': 'Test_author',
+                                           'post_id': self.post.id})
+        self.edit_url = reverse('post_edit', kwargs={
+            'username': 'Test_author', 'post_id': self.post.id
+        })
+
+    def test_edit_link_is_not_shared(self):
+        self.assertNotContains(self.reader_client.get(self.url), self.edit_url)
+        self.assertContains(self.author_client.get(self.url), self.edit_url)
+        self.assertNotContains(self.reader_client.get(self.url), self.edit_url)
+
+    def test_card_depends_on_version(self):
+        self.reader_client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Без новой версии')
+        self.assertContains(self.reader_client.get(self.url), 'Текст')
+        self.post.text = 'Новая версия'
+        self.post.save()
+        self.assertContains(self.reader_client.get(self.url), 'Новая версия')
+
+    @override_settings(POSTS_CACHE_TIMEOUT=0)
+    def test_card_uses_cache_timeout(self):
+        self.reader_client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Без новой версии')
+        self.assertContains(
+            self.reader_client.get(self.url), 'Без новой версии',
+            msg_prefix='Карточка живёт дольше POSTS_CACHE_TIMEOUT'
+        )
+
+    def test_card_depends_on_comments(self):
+        self.reader_client.get(self.url)
+        self.reader_client.post(
+            reverse('add_comment', kwargs={'username': 'Test_author',
+                                           'post_id': self.post.id}),
+            {'text': 'Комментарий'},
+        )
+        self.assertContains(self.reader_client.get(self.url),
+                            'Комментариев: 1')
@@ -0,0 +1,113 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..models import Follow, Group, Post
+
+
+@mock.patch('django.db.transaction.on_commit', lambda func: func())
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username='Test')
+        cls.reader = User.objects.create(username='Test_reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-group',
+            description='тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.user, group=cls.group
+        )
+        cls.guest_client = Client()
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.urls = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test-group'}),
+            reverse('profile', kwargs={'username': 'Test'}),
+            reverse('post', kwargs={'username': 'Test',
+                                    'post_id': cls.post.id}),
+        )
+
+    def test_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertEqual(
+                    self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    ).status_code,
+                    304,
+                    'Неизменённая страница отдаётся целиком'
+                )
+
+    def test_if_modified_since_is_not_trusted(self):
+        response = self.guest_client.get(self.urls[0])
+        self.assertFalse(response.has_header('Last-Modified'))
+        Post.objects.create(text='Новый текст', author=self.user)
+        self.assertEqual(
+            self.guest_client.get(
+                self.urls[0],
+                HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+            ).status_code,
+            200,
+            'Запись в ту же секунду скрыта ответом 304'
+        )
+
+    def test_changes_invalidate_etag(self):
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(
+            text='Новый текст', author=self.user, group=self.group
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    ).status_code,
+                    200,
+                    'После новой записи отдаётся устаревшая страница'
+                )
+
+    def test_page_read_before_commit(self):
+        url = self.urls[0]
+        callbacks = []
+        with mock.patch('django.db.transaction.on_commit', callbacks.append):
+            Post.objects.create(text='Новый текст', author=self.user)
+            # Запрос, пришедший до фиксации записи
+            etag = self.guest_client.get(url)['ETag']
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+            'ETag, выданный до фиксации, подтверждает новую страницу'
+        )
+        self.assertContains(self.guest_client.get(url), 'Новый текст')
+
+    def test_follow_invalidates_profile(self):
+        url = self.urls[2]
+        etag = self.guest_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(
+            self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+
+    def test_authorized_user_is_not_validated(self):
+        response = self.authorized_client.get(self.urls[0])
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_missing_group(self):
+        response = self.guest_client.get(
+            reverse('group_posts', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
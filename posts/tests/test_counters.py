@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username='Test_user')
+        cls.author = User.objects.create(username='Test_author')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        self.author_client.post(reverse('new_post'), {'text': 'Текст'})
+        post = Post.objects.get(author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.authorized_client.post(
+            reverse('add_comment', kwargs={'username': 'Test_author',
+                                           'post_id': post.id}),
+            {'text': 'Комментарий'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1,
+                         'Счётчик комментариев не увеличился')
+        Comment.objects.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0,
+                         'Счётчик комментариев не уменьшился')
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0,
+                         'Счётчик записей не уменьшился')
+
+    def test_follow_counters(self):
+        self.authorized_client.get(
+            reverse('profile_follow', kwargs={'username': 'Test_author'})
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).followings_count, 1)
+        response = self.authorized_client.get(
+            reverse('profile', kwargs={'username': 'Test_author'})
+        )
+        self.assertEqual(response.context.get('followers'), 1)
+        self.authorized_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'Test_author'})
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).followings_count, 0)
+
+    def test_profile_without_stats(self):
+        response = self.authorized_client.get(
+            reverse('profile', kwargs={'username': 'Test_author'})
+        )
+        self.assertEqual(response.context.get('post_count'), 0)
+
+    def test_reconcile_fixes_drift(self):
+        post = Post.objects.create(text='Текст', author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.bulk_create(
+            [Post(text='Без сигналов', author=self.author)]
+        )
+        UserStats.objects.filter(user=self.user).update(followings_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        stats = self.stats(self.author)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count), (2, 1),
+            'Команда сверки не исправила счётчики'
+        )
+        self.assertEqual(self.stats(self.user).followings_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
@@ -0,0 +1,121 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import export
+from ..models import Comment, Post
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_EAGER=True)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username='Test')
+        cls.other = User.objects.create(username='Other')
+        cls.post = Post.objects.create(
+            text='Запись с картинкой', author=cls.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        Post.objects.create(text='Вторая, с запятой', author=cls.user)
+        Post.objects.create(text='Чужая запись', author=cls.other)
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Мой комментарий'
+        )
+        cls.owner_client = Client()
+        cls.owner_client.force_login(cls.user)
+        cls.other_client = Client()
+        cls.other_client.force_login(cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def export(self, **params):
+        response = self.owner_client.get(
+            reverse('export', kwargs={'username': 'Test'}), params
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming, 'Выгрузка не потоковая')
+        return b''.join(response.streaming_content)
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in
+                self.export().decode().splitlines()]
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', 'Запись с картинкой'),
+             ('post', 'Вторая, с запятой'),
+             ('comment', 'Мой комментарий')],
+        )
+        self.assertEqual(rows[0]['image'], self.post.image.name)
+        self.assertEqual(rows[2]['post'], self.post.pk)
+
+    def test_csv(self):
+        lines = self.export(format='csv').decode().splitlines()
+        self.assertEqual(lines[0], ','.join(export.CSV_FIELDS))
+        self.assertIn('"Вторая, с запятой"', lines[2])
+        self.assertEqual(len(lines), 4)
+
+    def test_zip_with_images(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export(zip=1)))
+        self.assertEqual(
+            archive.namelist(),
+            ['export.ndjson', f'images/{self.post.image.name}'],
+        )
+        self.assertEqual(
+            archive.read(f'images/{self.post.image.name}'), SMALL_GIF
+        )
+        self.assertEqual(
+            len(archive.read('export.ndjson').splitlines()), 3
+        )
+
+    def test_rows_are_fetched_in_chunks(self):
+        with mock.patch.object(export, 'CHUNK_SIZE', 1), \
+                mock.patch('django.db.models.query.QuerySet.iterator',
+                           autospec=True,
+                           side_effect=lambda qs, chunk_size: iter(
+                               list(qs)
+                           )) as iterator:
+            self.export()
+        self.assertEqual(
+            [call.args[1] for call in iterator.call_args_list], [1, 1],
+            'Выгрузка читает строки не через iterator(chunk_size)'
+        )
+
+    def test_only_owner_can_export(self):
+        response = self.other_client.get(
+            reverse('export', kwargs={'username': 'Test'})
+        )
+        self.assertEqual(response.status_code, 403)
+        response = Client().get(
+            reverse('export', kwargs={'username': 'Test'})
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_command(self):
+        path = os.path.join(MEDIA_ROOT, 'export.csv')
+        call_command('export_posts', 'Test', format='csv', output=path)
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(len(file.read().splitlines()), 4)
@@ -0,0 +1,173 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feeds
+from ..models import FeedEntry, Follow, Post
+from ..paginators import NEXT, PREVIOUS, CursorPage, ordered
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.reader = User.objects.create(username='Test_reader')
+        cls.author = User.objects.create(username='Test_author')
+        cls.other = User.objects.create(username='Test_other')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author
+        )
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def feed(self):
+        return list(Post.objects.filter(feed_entries__user=self.reader))
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        self.reader_client.get(
+            reverse('profile_follow', kwargs={'username': 'Test_author'})
+        )
+        self.assertEqual(
+            self.feed(), [self.old_post],
+            'Лента не заполнена старыми записями автора после подписки'
+        )
+        self.reader_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'Test_author'})
+        )
+        self.assertEqual(self.feed(), [], 'Лента не очищена после отписки')
+
+    def test_new_post_fans_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.other)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual(list(response.context.get('page')), self.feed())
+
+    @override_settings(FEED_MAX_LENGTH=3)
+    def test_feed_is_capped(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=str(i), author=self.author)
+            for i in range(5)
+        ]
+        self.assertEqual(
+            self.feed(), posts[::-1][:3],
+            'Лента не обрезается до FEED_MAX_LENGTH'
+        )
+
+    def test_feed_reads_entry_index(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=str(i), author=self.author)
+            for i in range(3)
+        ]
+        entries, _ = feeds.feed_sources(self.reader)
+        first = list(ordered(entries)[:2])
+        self.assertEqual(first, posts[::-1][:2])
+        cursor = (NEXT, first[-1].pub_date, first[-1].pk)
+        self.assertEqual(
+            list(ordered(entries, cursor)), [posts[0], self.old_post]
+        )
+        for cursor in (None, cursor, (PREVIOUS, *cursor[1:])):
+            sql, params = ordered(entries, cursor)[:11].query.sql_with_params()
+            with connection.cursor() as db:
+                db.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(row[-1] for row in db.fetchall())
+            self.assertIn('feed_user_pub_date_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan, 'Лента сортируется заново')
+
+    def test_rebuild_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post])
+
+
+@override_settings(FEED_PULL_THRESHOLD=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.reader = User.objects.create(username='Test_reader')
+        cls.fan = User.objects.create(username='Test_fan')
+        cls.star = User.objects.create(username='Test_star')
+        cls.author = User.objects.create(username='Test_author')
+        for user in (cls.reader, cls.fan):
+            Follow.objects.create(user=user, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        feeds.refresh_pull_authors()
+
+    def tearDown(self):
+        cache.delete(feeds.PULL_AUTHORS_KEY)
+
+    def test_popular_author_is_pulled(self):
+        self.assertEqual(feeds.pull_authors(), {self.star.id})
+        star_post = Post.objects.create(text='Звезда', author=self.star)
+        self.assertFalse(
+            FeedEntry.objects.filter(post=star_post).exists(),
+            'Запись популярного автора разложена по лентам'
+        )
+        posts = [
+            Post.objects.create(text='Автор', author=self.author),
+            Post.objects.create(text='Звезда 2', author=self.star),
+        ]
+        response = self.reader_client.get(reverse('follow_index'))
+        page = response.context.get('page')
+        self.assertIsInstance(page, CursorPage)
+        self.assertEqual(
+            list(page), [posts[1], posts[0], star_post],
+            'Лента неверно сливает разложенные и подтянутые записи'
+        )
+
+    def test_merged_feed_cursor(self):
+        expected = []
+        for i in range(23):
+            author = self.star if i % 2 else self.author
+            expected.append(Post.objects.create(text=str(i), author=author))
+        expected.reverse()
+        url = reverse('follow_index')
+        pages = []
+        page = self.reader_client.get(url).context.get('page')
+        pages.extend(page)
+        while page.has_next():
+            page = self.reader_client.get(
+                url, {'cursor': page.next_cursor}
+            ).context.get('page')
+            pages.extend(page)
+        self.assertEqual(len(pages), 23)
+        self.assertEqual(pages, expected)
+
+    def test_demoted_author_is_backfilled(self):
+        star_post = Post.objects.create(text='Звезда', author=self.star)
+        Follow.objects.filter(user=self.fan).delete()
+        # Список популярных авторов хранится в базе, а не только в кэше
+        cache.clear()
+        feeds.refresh_pull_authors()
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=self.reader, post=star_post
+            ).exists(),
+            'Лента не дозаполнена после потери автором популярности'
+        )
+
+    def test_reading_does_not_refresh(self):
+        Follow.objects.filter(author=self.star).delete()
+        cache.clear()
+        self.assertEqual(
+            feeds.pull_authors(), {self.star.id},
+            'Список популярных авторов пересчитан при чтении'
+        )
+        self.assertEqual(feeds.refresh_pull_authors(), frozenset())
+        self.assertEqual(feeds.pull_authors(), frozenset())
@@ -127,12 +127,12 @@ class PostCreateFormTests(TestCase):
             with self.subTest(i=i):
                 self.assertEqual(
                     i.context.get('page')[0].image,
-                    'posts/small.gif',
+                    self.post_new.image.name,
                     'Картинка не найдена на странице группы или профайла'
                 )
         self.assertEqual(
             post_image0,
-            'posts/small.gif',
+            self.post_new.image.name,
             'Картинка не найдена на странице поста'
         )
 
@@ -158,9 +158,10 @@ class PostCreateFormTests(TestCase):
             reverse('index'),
             msg_prefix='Ошибка редиректа при создании поста с картинкой'
         )
+        # Та же картинка под другим именем хранится одним файлом
         self.assertEqual(
             response.context.get('page')[0].image,
-            'posts/small2.gif',
+            self.post_new.image.name,
             'Картинка не найдена на главной странице'
         )
         self.assertEqual(
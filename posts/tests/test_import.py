@@ -0,0 +1,257 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db.models import Max
+from django.test import TestCase
+
+from .. import bulk_import, search
+from ..models import Comment, FeedEntry, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class ImportDataTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, rows=None, text=None):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            if text is not None:
+                file.write(text)
+            for row in rows or ():
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return path
+
+    def import_data(self, errors=None, **files):
+        output = StringIO()
+        call_command('import_data', batch_size=2, stdout=output,
+                     stderr=errors or StringIO(), **files)
+        return output.getvalue()
+
+    def test_import_all_kinds(self):
+        User.objects.create(username='old')
+        output = self.import_data(
+            users=self.write('users.jsonl', [
+                {'username': 'leo', 'first_name': 'Лев'},
+                {'username': 'fedor'},
+                {'username': 'old'},
+                {'username': 'leo'},
+            ]),
+            groups=self.write(
+                'groups.csv', text='slug,title\ncats,Котики\n'
+            ),
+            posts=self.write('posts.jsonl', [
+                {'id': 10, 'author': 'leo', 'group': 'cats',
+                 'text': 'Котик спит', 'pub_date': '2020-01-02T03:04:05'},
+                {'id': 11, 'author': 'leo', 'text': 'Собака гуляет'},
+                {'id': 12, 'author': 'nobody', 'text': 'Потеряшка'},
+            ]),
+            comments=self.write('comments.jsonl', [
+                {'post': 10, 'author': 'fedor', 'text': 'Мило'},
+                {'post': 99, 'author': 'fedor', 'text': 'Мимо'},
+            ]),
+            follows=self.write(
+                'follows.csv',
+                text='user,author\nfedor,leo\nfedor,leo\nleo,leo\n',
+            ),
+        )
+        self.assertIn('users: загружено 2, пропущено 2', output)
+        self.assertIn('posts: загружено 2, пропущено 1', output)
+        leo = User.objects.get(username='leo')
+        self.assertEqual(leo.first_name, 'Лев')
+        self.assertFalse(leo.has_usable_password())
+        post = Post.objects.get(pk=10)
+        self.assertEqual(post.author, leo)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(
+            post.pub_date.isoformat(), '2020-01-02T03:04:05+00:00',
+            'Дата записи из файла не сохранена'
+        )
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertEqual(Follow.objects.count(), 1, 'Подписки задвоены')
+        fedor = User.objects.get(username='fedor')
+        self.assertEqual(
+            FeedEntry.objects.filter(user=fedor).count(), 2,
+            'Лента подписчика не собрана'
+        )
+        stats = UserStats.objects.get(user=leo)
+        self.assertEqual((stats.posts_count, stats.followers_count), (2, 1))
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        if search.available():
+            self.assertEqual(
+                list(search.filter_posts(Post.objects.all(), 'котик')),
+                [post],
+                'Поисковый индекс не обновлён'
+            )
+
+    def test_interrupted_import_is_searchable(self):
+        User.objects.create(username='leo')
+        with mock.patch('posts.bulk_import.Importer.finish',
+                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.import_data(posts=self.write(
+                    'posts.jsonl', [{'author': 'leo', 'text': 'Котик'}]
+                ))
+        Post.objects.create(
+            text='Котик после импорта', author=User.objects.get()
+        )
+        self.assertEqual(
+            set(search.filter_posts(Post.objects.all(), 'котик')),
+            set(Post.objects.all()),
+            'Записи не попали в индекс, хотя загрузка прервалась'
+        )
+
+    def test_bad_rows_are_reported(self):
+        User.objects.create(username='leo')
+        errors = StringIO()
+        output = self.import_data(
+            errors=errors,
+            users=self.write('users.jsonl', [
+                {'username': 'plain', 'password': 'secret'},
+                {'username': 'hashed',
+                 'password': make_password('secret')},
+            ]),
+            posts=self.write('posts.jsonl', [
+                {'id': 'x1', 'author': 'leo', 'text': 'Неверный id'},
+                {'id': -5, 'author': 'leo', 'text': 'Отрицательный id'},
+                {'id': 7, 'author': 'leo', 'text': 'Неверная дата',
+                 'pub_date': 'вчера'},
+                {'id': 8, 'author': 'leo', 'text': 'Верная'},
+            ]),
+            comments=self.write('comments.jsonl', [
+                {'post': '8a', 'author': 'leo', 'text': 'Мимо'},
+                {'post': 8, 'author': 'leo', 'text': 'Мило'},
+            ]),
+        )
+        self.assertIn('users: загружено 1, пропущено 1', output)
+        self.assertIn('posts: загружено 1, пропущено 3', output)
+        self.assertIn('comments: загружено 1, пропущено 1', output)
+        self.assertFalse(
+            User.objects.filter(username='plain').exists(),
+            'Пароль сохранён без хеширования'
+        )
+        self.assertTrue(
+            User.objects.get(username='hashed').check_password('secret')
+        )
+        self.assertEqual(errors.getvalue().count('Пропущено'), 5,
+                         'Неверные строки не перечислены')
+
+    def test_duplicate_ids_in_chunk_are_reported(self):
+        User.objects.create(username='leo')
+        errors = StringIO()
+        output = self.import_data(
+            errors=errors,
+            posts=self.write('posts.jsonl', [
+                {'id': 5, 'author': 'leo', 'text': 'Первая'},
+                {'id': 5, 'author': 'leo', 'text': 'Повтор'},
+            ]),
+            comments=self.write('comments.jsonl', [
+                {'id': 3, 'post': 5, 'author': 'leo', 'text': 'Первый'},
+                {'id': 3, 'post': 5, 'author': 'leo', 'text': 'Повтор'},
+            ]),
+        )
+        self.assertIn('posts: загружено 1, пропущено 1', output)
+        self.assertIn('comments: загружено 1, пропущено 1', output)
+        self.assertEqual(Post.objects.get(pk=5).text, 'Первая')
+        self.assertEqual(Comment.objects.get(pk=3).text, 'Первый')
+        self.assertEqual(errors.getvalue().count('повтор id'), 2,
+                         'Повторы id не перечислены')
+
+    def test_other_saves_keep_auto_now(self):
+        leo = User.objects.create(username='leo')
+        during = []
+
+        def rows():
+            yield {'author': 'leo', 'text': 'Старая',
+                   'pub_date': '2020-01-02T03:04:05'}
+            # Запись с сайта, пока идёт загрузка
+            during.append(Post.objects.create(text='Новая', author=leo))
+            yield {'author': 'leo', 'text': 'Ещё старая',
+                   'pub_date': '2020-01-03T03:04:05'}
+
+        bulk_import.Importer(batch_size=1).load('posts', rows())
+        self.assertIsNotNone(
+            during[0].pub_date, 'auto_now_add отключён во время загрузки'
+        )
+        self.assertEqual(
+            Post.objects.filter(pub_date__year=2020).count(), 2,
+            'Дата записи из файла не сохранена'
+        )
+
+    def test_repeated_import_skips_existing_ids(self):
+        User.objects.create(username='leo')
+        path = self.write('posts.jsonl', [
+            {'id': 1, 'author': 'leo', 'text': 'Первая'},
+        ])
+        self.import_data(posts=path)
+        output = self.import_data(posts=path)
+        self.assertIn('posts: загружено 0, пропущено 1', output)
+        self.assertEqual(Post.objects.count(), 1)
+
+
+class GenerateDataTests(TestCase):
+    def generate(self, **options):
+        call_command('generate_data', users=50, groups=3, posts=500,
+                     comments=200, follows=300, stdout=StringIO(), **options)
+
+    def test_counts_and_skew(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 500)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        top = Post.objects.filter(author__username='user0').count()
+        tail = Post.objects.filter(author__username='user49').count()
+        self.assertGreater(top, 10 * max(tail, 1),
+                           'Записи не распределены по степенному закону')
+        self.assertEqual(
+            UserStats.objects.get(user__username='user0').posts_count, top,
+            'Счётчики не пересчитаны'
+        )
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('username').values_list(
+                'username', 'date_joined'
+            )),
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'text', 'pub_date'
+            )),
+            list(Comment.objects.order_by('pk').values_list(
+                'post_id', 'author__username', 'text', 'created'
+            )),
+        )
+
+    def test_same_seed_same_data(self):
+        self.generate(seed=7)
+        first = self.snapshot()
+        User.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(self.snapshot(), first,
+                         'Один seed дал разные данные')
+
+    def test_dates_are_anchored(self):
+        self.generate(now='2020-06-01T00:00:00')
+        anchor = datetime(2020, 6, 1, tzinfo=timezone.utc)
+        self.assertLessEqual(
+            Post.objects.aggregate(last=Max('pub_date'))['last'], anchor
+        )
+        for comment in Comment.objects.select_related('post'):
+            self.assertGreaterEqual(
+                comment.created, comment.post.pub_date,
+                'Комментарий старше записи'
+            )
+            self.assertLessEqual(comment.created, anchor)
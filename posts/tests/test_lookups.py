@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import lookups
+from ..models import Group
+
+
+class LookupsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username='Test')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-group',
+            description='тестовое описание',
+        )
+        cls.guest_client = Client()
+
+    def test_lookups_are_cached(self):
+        lookups.get_group('test-group')
+        lookups.get_user('Test')
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.get_group('test-group'), self.group)
+            self.assertEqual(lookups.get_user('Test'), self.user)
+        lookups.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                lookups.get_group('test-group'),
+                self.group,
+                'Группа не найдена в общем кэше'
+            )
+
+    def test_password_is_not_cached(self):
+        self.assertNotIn('password', lookups.get_user('Test').__dict__)
+
+    @mock.patch('django.db.transaction.on_commit', lambda func: func())
+    def test_rename_invalidates(self):
+        lookups.get_group('test-group')
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertEqual(
+            self.guest_client.get(
+                reverse('group_posts', kwargs={'slug': 'test-group'})
+            ).status_code,
+            404,
+            'Группа находится по старому адресу'
+        )
+        self.assertEqual(
+            self.guest_client.get(
+                reverse('group_posts', kwargs={'slug': 'renamed'})
+            ).status_code,
+            200,
+        )
+
+    @override_settings(LOOKUPS_SYNC_INTERVAL=0)
+    def test_invalidation_reaches_other_processes(self):
+        # Второй экземпляр играет роль кэша другого процесса
+        other = lookups.TwoTierCache(10)
+        load = Group.objects.get
+        self.assertEqual(
+            other.get('group:test-group', lambda: load(pk=self.group.pk)),
+            self.group,
+        )
+        Group.objects.filter(pk=self.group.pk).update(title='Новое название')
+        lookups.invalidate_groups('test-group')
+        self.assertEqual(
+            other.get(
+                'group:test-group', lambda: load(pk=self.group.pk)
+            ).title,
+            'Новое название',
+            'Сброс не дошёл до первого уровня другого процесса'
+        )
+
+    def test_invalidation_waits_for_commit(self):
+        callbacks = []
+        with mock.patch('django.db.transaction.on_commit', callbacks.append):
+            self.group.title = 'Новое название'
+            self.group.save()
+        # До фиксации сброс не записан в журнал, и старую строку,
+        # перечитанную другим процессом, потом никто бы не сбросил
+        self.assertIsNone(cache.get(lookups.SEQ_KEY))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            lookups.get_group('test-group').title, 'Новое название'
+        )
+
+    def test_local_entries_expire(self):
+        other = lookups.TwoTierCache(10)
+        load = Group.objects.get
+        other.get('group:test-group', lambda: load(pk=self.group.pk))
+        Group.objects.filter(pk=self.group.pk).update(title='Новое название')
+        # Сброс потерялся: общий кэш пуст, журнал о нём не знает
+        cache.delete('posts:lookups:group:test-group')
+        with override_settings(LOOKUPS_L1_MAX_AGE=0):
+            self.assertEqual(
+                other.get(
+                    'group:test-group', lambda: load(pk=self.group.pk)
+                ).title,
+                'Новое название',
+                'Строка живёт в памяти процесса без срока'
+            )
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..paginators import CursorPage
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username='Test')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-group',
+            description='тестовое описание',
+        )
+        for i in range(25):
+            Post.objects.create(
+                text='text' + str(i),
+                author=cls.user,
+                group=cls.group,
+            )
+        cls.posts = list(Post.objects.all())
+        cls.guest_client = Client()
+
+    def walk(self, url):
+        pages = []
+        response = self.guest_client.get(url)
+        pages.append(list(response.context.get('page')))
+        page = response.context.get('page')
+        while page.next_cursor:
+            response = self.guest_client.get(
+                url, {'cursor': str(page.next_cursor)}
+            )
+            page = response.context.get('page')
+            self.assertIsInstance(page, CursorPage)
+            pages.append(list(page))
+        return pages, page
+
+    def test_cursor_walks_whole_feed(self):
+        urls = {
+            reverse('index'): 10,
+            reverse('group_posts', kwargs={'slug': 'test-group'}): 10,
+            reverse('profile', kwargs={'username': 'Test'}): 5,
+        }
+        for url, per_page in urls.items():
+            with self.subTest(url=url):
+                pages, last_page = self.walk(url)
+                posts = [post for page in pages for post in page]
+                self.assertEqual(
+                    posts,
+                    self.posts,
+                    'Курсорная пагинация теряет или дублирует записи'
+                )
+                self.assertEqual(
+                    len(pages[0]),
+                    per_page,
+                    'Неверный размер страницы'
+                )
+                self.assertFalse(last_page.has_next())
+
+    def test_previous_cursor(self):
+        url = reverse('index')
+        first = self.guest_client.get(url).context.get('page')
+        second = self.guest_client.get(
+            url, {'cursor': str(first.next_cursor)}
+        ).context.get('page')
+        third = self.guest_client.get(
+            url, {'cursor': second.next_cursor}
+        ).context.get('page')
+        back = self.guest_client.get(
+            url, {'cursor': third.previous_cursor}
+        ).context.get('page')
+        self.assertEqual(
+            list(back),
+            list(second),
+            'Курсор предыдущей страницы ведёт не туда'
+        )
+        top = self.guest_client.get(
+            url, {'cursor': back.previous_cursor}
+        ).context.get('page')
+        self.assertEqual(list(top), self.posts[:10])
+        self.assertFalse(top.has_previous())
+
+    def test_page_number_fallback(self):
+        response = self.guest_client.get(reverse('index'), {'page': 2})
+        page = response.context.get('page')
+        self.assertEqual(
+            list(page),
+            self.posts[10:20],
+            'Старые ссылки вида ?page=N перестали работать'
+        )
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+        self.assertContains(response, f'?cursor={page.previous_cursor}')
+
+    def test_broken_cursor(self):
+        response = self.guest_client.get(
+            reverse('index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context.get('page')), self.posts[:10])
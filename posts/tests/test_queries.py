@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import lookups
+from ..models import Comment, Follow, Group, Post
+
+
+class ListingQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.reader = User.objects.create(username='Test_reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-group',
+            description='тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create(username=f'Test_author{i}') for i in range(10)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.urls = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test-group'}),
+            reverse('profile', kwargs={'username': 'Test_author0'}),
+            reverse('follow_index'),
+        )
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Текст {i}',
+                author=self.authors[0] if i % 2 else self.authors[i % 10],
+                group=self.group,
+            )
+            Comment.objects.create(post=post, author=self.reader, text='К')
+
+    def count_queries(self, url):
+        cache.clear()
+        lookups.clear_local()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(response.context.get('page'))
+
+    def test_queries_do_not_grow_with_page_size(self):
+        self.add_posts(1)
+        small = {url: self.count_queries(url) for url in self.urls}
+        self.add_posts(20)
+        for url in self.urls:
+            with self.subTest(url=url):
+                queries, posts = self.count_queries(url)
+                self.assertGreater(posts, small[url][1])
+                self.assertEqual(
+                    queries,
+                    small[url][0],
+                    'Число запросов растёт вместе с числом записей на странице'
+                )
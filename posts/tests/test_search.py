@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username='Test')
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.rare = Post.objects.create(
+            text='Котик спит на окне', author=cls.user
+        )
+        cls.often = Post.objects.create(
+            text='Котик, котик и ещё раз котик', author=cls.user
+        )
+        Post.objects.create(text='Собака гуляет', author=cls.user)
+        cls.guest_client = Client()
+
+    def found(self, query, **params):
+        response = self.guest_client.get(
+            reverse('search'), {'q': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.context['page']
+
+    def test_ranking(self):
+        self.assertEqual(
+            list(self.found('котик')),
+            [self.often, self.rare],
+            'Более подходящая запись не на первом месте'
+        )
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(len(self.found('котик: "окне*')), 1)
+        self.assertEqual(len(self.found('!!!')), 0)
+
+    def test_cursor_paging(self):
+        for i in range(15):
+            Post.objects.create(text=f'Котик номер {i}', author=self.user)
+        first = self.found('котик')
+        self.assertEqual(len(first), 10)
+        second = self.found('котик', cursor=first.next_cursor)
+        self.assertEqual(len(second), 7)
+        self.assertFalse(second.has_next())
+        self.assertFalse(
+            {post.pk for post in first} & {post.pk for post in second}
+        )
+
+    def test_index_follows_changes(self):
+        Post.objects.filter(pk=self.rare.pk).update(text='Птица поёт')
+        self.assertEqual(list(self.found('птица')), [self.rare])
+        self.assertEqual(list(self.found('котик')), [self.often])
+        Post.objects.filter(pk=self.often.pk).delete()
+        self.assertEqual(len(self.found('котик')), 0)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as db:
+            db.execute(
+                f"INSERT INTO {search.FTS_TABLE} ({search.FTS_TABLE}) "
+                "VALUES ('delete-all')"
+            )
+        self.assertEqual(len(self.found('котик')), 0)
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(self.found('котик')), 2)
+
+    def test_admin_search(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собака'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котик'}
+        )
+        self.assertEqual(
+            response.context['cl'].result_count, 2,
+            'Найдена не каждая подходящая запись'
+        )
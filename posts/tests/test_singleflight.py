@@ -0,0 +1,77 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from .. import singleflight
+
+
+class SingleFlightTests(TestCase):
+    def test_value_is_cached(self):
+        compute = mock.Mock(return_value='значение')
+        for _ in range(3):
+            self.assertEqual(
+                singleflight.get_or_set('key', compute, 60), 'значение'
+            )
+        compute.assert_called_once()
+
+    def test_stale_value_served_while_locked(self):
+        singleflight.get_or_set('key', lambda: 'старое', 60)
+        with mock.patch('time.time', return_value=time.time() + 61):
+            cache.add('singleflight:key:lock', 1)
+            self.assertEqual(
+                singleflight.get_or_set('key', lambda: 'новое', 60),
+                'старое',
+                'Пока значение пересчитывают, отдаётся устаревшее'
+            )
+            cache.delete('singleflight:key:lock')
+            self.assertEqual(
+                singleflight.get_or_set('key', lambda: 'новое', 60), 'новое'
+            )
+        self.assertEqual(singleflight.stats()['stale_served'], 1)
+
+    def test_early_refresh(self):
+        singleflight.get_or_set('key', lambda: 'значение', 60)
+        value, delta, expires = cache.get('singleflight:key')
+        # Вычисление "долгое", а до конца срока секунда: обновляем заранее
+        cache.set('singleflight:key', (value, 100, expires), 60)
+        with mock.patch('time.time', return_value=expires - 1), \
+                mock.patch('random.random', return_value=0.5):
+            self.assertEqual(
+                singleflight.get_or_set('key', lambda: 'новое', 60), 'новое'
+            )
+        self.assertEqual(singleflight.stats()['early_refreshed'], 1)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'значение'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                singleflight.get_or_set('key', compute, 60)
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['значение'] * 5)
+        self.assertEqual(len(calls), 1, 'Значение пересчитано несколько раз')
+        self.assertEqual(singleflight.stats()['waited'], 4)
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load singleflight %}{% cache 60 fragment %}{{ value }}'
+            '{% endcache %}'
+        )
+        self.assertEqual(template.render(Context({'value': 'a'})), 'a')
+        self.assertEqual(template.render(Context({'value': 'b'})), 'a')
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.test import SimpleTestCase
+
+from yatube.cache import SQLiteCache
+
+
+def _incr_many(location, count):
+    cache = SQLiteCache(location, {})
+    for _ in range(count):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_ENTRIES': 50}}
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_basic_operations(self):
+        self.cache.set('key', {'значение': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'значение': [1, 2]})
+        self.assertFalse(self.cache.add('key', 'другое'))
+        self.assertTrue(self.cache.add('new', 'другое'))
+        self.cache.set('expired', 1, -1)
+        self.assertIsNone(self.cache.get('expired'))
+        self.assertTrue(self.cache.add('expired', 2))
+        self.cache.set_many({'a': 1, 'b': 'б'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 'б'}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = get_context('fork')
+        workers = [
+            context.Process(target=_incr_many, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(
+            self.cache.get('counter'), 200, 'Инкременты процессов потерялись'
+        )
+
+    def test_size_is_bounded(self):
+        self.cache.set('hot', 'значение')
+        for i in range(200):
+            self.cache.set(f'key{i}', i)
+            self.cache.get('hot')
+        count = self.cache._db.execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        self.assertLessEqual(count, 50 + self.cache._cull_every)
+
+    def test_entry_count_is_maintained(self):
+        def counts():
+            db = self.cache._db
+            return (
+                db.execute('SELECT entries FROM cache_size').fetchone()[0],
+                db.execute('SELECT COUNT(*) FROM cache').fetchone()[0],
+            )
+
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.set('a', 3)
+        self.cache.add('b', 4)
+        self.cache.add('c', 5)
+        self.assertEqual(counts(), (3, 3))
+        self.cache.delete('a')
+        self.assertEqual(counts(), (2, 2))
+        self.cache.clear()
+        self.assertEqual(counts(), (0, 0))
+
+    def test_read_does_not_wait_for_writer(self):
+        self.cache.set('key', 'значение')
+        self.cache._db.execute("UPDATE cache SET accessed = 0")
+        writer = sqlite3.connect(self.location, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        try:
+            started = time.monotonic()
+            self.assertEqual(self.cache.get('key'), 'значение')
+            self.assertLess(time.monotonic() - started, 1,
+                            'Чтение ждёт, пока писатель отпустит файл')
+        finally:
+            writer.execute('ROLLBACK')
+            writer.close()
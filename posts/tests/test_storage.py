@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import media
+from ..models import MediaFile, Post
+from ..storage import is_hashed, post_images
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_EAGER=True)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username='Test')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, name='small.gif', content=SMALL_GIF):
+        return Post.objects.create(
+            text='Текст',
+            author=self.user,
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def test_name_is_sharded_hash(self):
+        name = self.create_post().image.name
+        self.assertTrue(is_hashed(name), 'Имя картинки не по содержимому')
+        self.assertRegex(
+            name, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$',
+            'Картинка не разложена по каталогам'
+        )
+        self.assertTrue(post_images.exists(name), 'Файл не сохранён')
+
+    def test_identical_uploads_share_file(self):
+        first = self.create_post('small.gif')
+        second = self.create_post('other.gif')
+        self.assertEqual(
+            first.image.name, second.image.name,
+            'Одинаковые картинки сохранены разными файлами'
+        )
+        self.assertEqual(
+            MediaFile.objects.get(name=first.image.name).refs, 2,
+            'Неверное число ссылок на файл'
+        )
+
+    @mock.patch('django.db.transaction.on_commit', lambda func: func())
+    def test_file_removed_after_last_reference(self):
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+        first.delete()
+        self.assertTrue(
+            post_images.exists(name), 'Файл удалён, хотя он ещё нужен'
+        )
+        second.delete()
+        self.assertFalse(
+            post_images.exists(name), 'Файл без ссылок не удалён'
+        )
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+
+    @mock.patch('django.db.transaction.on_commit', lambda func: func())
+    def test_replaced_image_is_released(self):
+        post = self.create_post()
+        old = post.image.name
+        post.image = SimpleUploadedFile('new.gif', SMALL_GIF + b'\0')
+        post.save()
+        self.assertNotEqual(post.image.name, old)
+        self.assertFalse(
+            post_images.exists(old), 'Заменённая картинка не удалена'
+        )
+
+    def test_reacquired_file_is_kept(self):
+        post = self.create_post()
+        name = post.image.name
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            post.delete()
+        # Пока удаление фиксировалось, такую же картинку загрузили снова
+        self.create_post()
+        on_commit.call_args[0][0]()
+        self.assertTrue(
+            post_images.exists(name), 'Удалён файл, на который есть ссылка'
+        )
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 1)
+
+    def test_reference_to_removed_file_is_refused(self):
+        name = self.create_post().image.name
+        # Загрузка нашла файл на месте, но до acquire его удалили
+        post_images.delete(name)
+        with self.assertRaises(FileNotFoundError):
+            media.acquire(name)
+
+    def write_legacy(self, legacy='posts/legacy.gif', content=SMALL_GIF):
+        os.makedirs(os.path.join(MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, legacy), 'wb') as output:
+            output.write(content)
+        return legacy
+
+    @mock.patch('django.db.transaction.on_commit', lambda func: func())
+    def test_migrate_media_moves_legacy_files(self):
+        legacy = self.write_legacy()
+        posts = [
+            Post.objects.create(text='Текст', author=self.user, image=legacy)
+            for _ in range(2)
+        ]
+        Post.objects.create(
+            text='Текст', author=self.user, image='posts/missing.gif'
+        )
+        call_command('migrate_media', stdout=StringIO(), stderr=StringIO())
+        names = {
+            Post.objects.get(pk=post.pk).image.name for post in posts
+        }
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_hashed(name), 'Старая картинка не перенесена')
+        self.assertTrue(post_images.exists(name))
+        self.assertFalse(post_images.exists(legacy))
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 2)
+        self.assertEqual(
+            name, post_images.save('posts/x.gif', ContentFile(SMALL_GIF)),
+            'Перенесённый файл не совпадает с загруженным заново'
+        )
+
+    def test_migrate_media_keeps_original_on_failure(self):
+        legacy = self.write_legacy()
+        post = Post.objects.create(
+            text='Текст', author=self.user, image=legacy
+        )
+        with mock.patch('posts.media.acquire', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                call_command('migrate_media', stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=post.pk).image.name, legacy)
+        self.assertTrue(
+            post_images.exists(legacy), 'Оригинал удалён до фиксации'
+        )
+
+    @mock.patch('django.db.transaction.on_commit', lambda func: func())
+    def test_migrate_media_pages_through_names(self):
+        posts = [
+            Post.objects.create(
+                text='Текст', author=self.user, image=self.write_legacy(
+                    f'posts/legacy{i}.gif', SMALL_GIF + bytes([i])
+                )
+            )
+            for i in range(5)
+        ]
+        out = StringIO()
+        call_command('migrate_media', batch_size=2, stdout=out)
+        self.assertIn('Перенесено картинок: 5, не найдено: 0', out.getvalue())
+        for post in posts:
+            self.assertTrue(
+                is_hashed(Post.objects.get(pk=post.pk).image.name),
+                'Картинка из следующей пачки не перенесена'
+            )
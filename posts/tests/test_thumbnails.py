@@ -0,0 +1,155 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from jobs.models import Job
+
+from .. import thumbnails
+from ..models import Post
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_EAGER=True)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username='Test')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def uploaded(self, name='small.gif'):
+        return SimpleUploadedFile(
+            name=name, content=SMALL_GIF, content_type='image/gif'
+        )
+
+    def test_page_does_not_build_thumbnails(self):
+        post = Post.objects.create(
+            text='Текст', author=self.user, image=self.uploaded()
+        )
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'Изображение обрабатывается')
+        self.assertIsNone(
+            thumbnails.ready(post.image),
+            'Миниатюра строится во время запроса страницы'
+        )
+
+    @mock.patch('django.db.transaction.on_commit', lambda func: func())
+    def test_new_post_builds_thumbnails(self):
+        self.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Текст', 'image': self.uploaded('new.gif')},
+        )
+        post = Post.objects.get(text='Текст')
+        thumbnail = thumbnails.ready(post.image)
+        self.assertIsNotNone(thumbnail, 'Миниатюра не построена заранее')
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, 'Изображение обрабатывается')
+
+    @override_settings(JOBS_EAGER=False)
+    def test_warm_command_queues_jobs(self):
+        post = Post.objects.create(
+            text='Текст', author=self.user, image=self.uploaded('old.gif')
+        )
+        call_command('warm_thumbnails', stdout=StringIO())
+        self.assertEqual(
+            list(Job.objects.values_list('task', 'payload')),
+            [('posts.generate_thumbnails',
+              json.dumps({'args': [post.image.name], 'kwargs': {}}))],
+        )
+        self.assertIsNone(thumbnails.ready(post.image))
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertIsNotNone(thumbnails.ready(post.image))
+        Job.objects.all().delete()
+        call_command('warm_thumbnails', stdout=StringIO())
+        self.assertFalse(Job.objects.exists(),
+                         'Готовые миниатюры поставлены в очередь снова')
+
+    @override_settings(JOBS_EAGER=False)
+    def test_warm_command_queues_in_batches(self):
+        # Разное содержимое: одинаковые картинки хранятся одним файлом
+        posts = [
+            Post.objects.create(
+                text='Текст', author=self.user, image=SimpleUploadedFile(
+                    f'{i}.gif', SMALL_GIF + bytes([i]), 'image/gif'
+                )
+            )
+            for i in range(5)
+        ]
+        out = StringIO()
+        call_command('warm_thumbnails', batch_size=2, stdout=out)
+        self.assertIn('Поставлено в очередь картинок: 5', out.getvalue())
+        self.assertCountEqual(
+            [json.loads(payload)['args'][0]
+             for payload in Job.objects.values_list('payload', flat=True)],
+            [post.image.name for post in posts],
+        )
+
+    def test_page_lookups_are_batched(self):
+        posts = [
+            Post.objects.create(
+                text='Текст', author=self.user, image=self.uploaded(f'{i}.gif')
+            )
+            for i in range(3)
+        ]
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        images = [post.image for post in posts]
+        with self.assertNumQueries(1):
+            thumbnails.ready_many(images)
+        with self.assertNumQueries(0):
+            thumbnails.ready_many(images)
+        response = self.authorized_client.get(reverse('index'))
+        for post in posts:
+            self.assertContains(response, thumbnails.ready(post.image).url)
+
+    def test_generation_refreshes_cached_lists(self):
+        post = Post.objects.create(
+            text='Текст', author=self.user, image=self.uploaded('late.gif')
+        )
+        self.authorized_client.get(reverse('index'))
+        thumbnails.generate(post.image.name)
+        response = self.authorized_client.get(reverse('index'))
+        self.assertNotContains(
+            response,
+            'Изображение обрабатывается',
+            msg_prefix='Заглушка осталась в закэшированном списке'
+        )
+
+    def test_responsive_variants(self):
+        post = Post.objects.create(
+            text='Текст', author=self.user, image=self.uploaded('wide.gif')
+        )
+        thumbnails.generate(post.image.name)
+        response = self.authorized_client.get(reverse('index'))
+        webp = thumbnails.ready(post.image, 'card-480-webp')
+        self.assertTrue(webp.name.endswith('.webp'))
+        self.assertEqual(webp.width, 480)
+        for text in (f'{webp.url} 480w', 'type="image/webp"',
+                     'loading="lazy"', 'sizes="'):
+            with self.subTest(text=text):
+                self.assertContains(response, text)
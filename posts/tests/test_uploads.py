@@ -0,0 +1,129 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..uploads import RejectedUpload
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name, size, image_format):
+    buffer = BytesIO()
+    Image.effect_noise(size, 50).convert('RGB').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username='Test')
+        cls.post = Post.objects.create(text='Текст', author=cls.user)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def upload(self, image, url=None):
+        url = url or reverse('new_post')
+        return self.authorized_client.post(
+            url, data={'text': 'Новый текст', 'image': image}
+        )
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(message, ' '.join(response.context['form'].errors.get(
+            'image', []
+        )))
+        self.assertFalse(Post.objects.filter(text='Новый текст').exists())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=1000)
+    def test_size_cap(self):
+        self.assertRejected(
+            self.upload(image_file('big.png', (100, 100), 'PNG')),
+            'Файл больше',
+        )
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_pixel_limit_from_header(self):
+        self.assertRejected(
+            self.upload(image_file('wide.png', (20, 20), 'PNG')),
+            'слишком большое',
+        )
+
+    def test_unsupported_format(self):
+        self.assertRejected(
+            self.upload(image_file('image.bmp', (20, 20), 'BMP')),
+            'Неподдерживаемый формат',
+        )
+
+    def test_not_an_image(self):
+        self.assertRejected(
+            self.upload(SimpleUploadedFile('fake.png', b'not an image')),
+            'изображение',
+        )
+
+    @override_settings(POST_IMAGE_MAX_BYTES=1000)
+    def test_edit_is_checked_too(self):
+        url = reverse(
+            'post_edit', kwargs={'username': 'Test', 'post_id': self.post.id}
+        )
+        self.assertRejected(
+            self.upload(image_file('big.png', (100, 100), 'PNG'), url),
+            'Файл больше',
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=10)
+    def test_oversized_original_is_downscaled(self):
+        self.upload(image_file('photo.jpg', (40, 20), 'JPEG'))
+        post = Post.objects.get(text='Новый текст')
+        self.assertEqual(
+            (post.image.width, post.image.height),
+            (10, 5),
+            'Оригинал не уменьшен при сохранении'
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=10)
+    def test_animation_is_kept(self):
+        frames = [Image.new('RGB', (40, 20), color) for color in
+                  ('red', 'green', 'blue')]
+        buffer = BytesIO()
+        frames[0].save(buffer, 'GIF', save_all=True,
+                       append_images=frames[1:])
+        self.upload(SimpleUploadedFile('anim.gif', buffer.getvalue()))
+        post = Post.objects.get(text='Новый текст')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(getattr(image, 'n_frames', 1), 3,
+                             'У анимации потерялись кадры')
+
+    def test_csrf_is_still_checked(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(
+            reverse('new_post'),
+            data={'text': 'Новый текст',
+                  'image': image_file('photo.png', (10, 10), 'PNG')},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_other_uploads_are_not_checked(self):
+        request = RequestFactory().post('/', data={
+            'file': SimpleUploadedFile('notes.txt', b'not an image'),
+        })
+        self.assertNotIsInstance(
+            request.FILES['file'], RejectedUpload,
+            'Картинки проверяются во всех загрузках сайта'
+        )
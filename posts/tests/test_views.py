@@ -1,5 +1,8 @@
+from io import StringIO
+
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -25,6 +28,8 @@ class ViewsTests(TestCase):
                 group=cls.group,
             ))
         cls.post = Post.objects.bulk_create(posts)
+        # bulk_create не отправляет сигналы, счётчики нужно сверить
+        call_command('reconcile_counters', stdout=StringIO())
         cls.second_group = Group.objects.create(
             title='Тестовый заголовок №2',
             slug='test-group2',
@@ -95,7 +100,7 @@ class ViewsTests(TestCase):
             'group_posts', kwargs={'slug': 'test-group2'}))
         group_posts = response.context.get('page')
         self.assertEqual(
-            group_posts.object_list.count(),
+            len(group_posts.object_list),
             0,
             'Пост найден в чужой группе'
         )
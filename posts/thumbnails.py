@@ -0,0 +1,167 @@
+"""Миниатюры картинок записей создаются заранее, а не при первом показе.
+
+new_post и post_edit ставят картинку в очередь задач, исполнитель
+которой строит миниатюры всех размеров из GEOMETRIES через get_thumbnail
+sorl и записывает готовые варианты в ImageVariants. Шаблоны только ищут
+эти варианты и до их появления показывают заглушку, поэтому запрос
+страницы никогда не ждёт обработки картинки.
+"""
+import json
+import logging
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import enqueue
+
+from . import caching
+from .models import ImageVariants, Post
+from .storage import post_images
+
+logger = logging.getLogger(__name__)
+
+# Ширины вариантов картинки карточки для srcset: телефоны получают
+# узкие файлы, браузеры с WebP - WebP, остальные - JPEG
+CARD_WIDTHS = (480, 720, 960)
+CARD_FORMATS = ('webp', 'jpeg')
+
+
+def _card(width, image_format):
+    options = {'crop': 'center', 'upscale': True}
+    if image_format == 'webp':
+        options.update(format='WEBP', quality=80)
+    return f'{width}x{round(width * 339 / 960)}', options
+
+
+# Все размеры, в которых шаблоны показывают картинки записей
+GEOMETRIES = {
+    f'card-{width}-{image_format}': _card(width, image_format)
+    for width in CARD_WIDTHS
+    for image_format in CARD_FORMATS
+}
+# Основной вариант для src: имя файла совпадает с прежней миниатюрой
+CARD = 'card-960-jpeg'
+
+
+Variant = namedtuple('Variant', 'name url width height')
+# Отсутствие вариантов тоже кэшируется, чтобы не спрашивать базу снова
+MISSING = 'missing'
+
+
+def _key(name):
+    return f'posts:variants:{name}'
+
+
+def _load(names):
+    """Варианты картинок по именам: один get_many и один запрос на промахи."""
+    keys = {_key(name): name for name in names}
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(ImageVariants.objects.filter(
+            name__in=[keys[key] for key in missing]
+        ).values_list('name', 'variants'))
+        fetched = {
+            key: json.loads(stored[keys[key]]) if keys[key] in stored
+            else MISSING
+            for key in missing
+        }
+        cache.set_many(fetched, settings.POSTS_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        keys[key]: value for key, value in values.items() if value != MISSING
+    }
+
+
+def ready(image, geometry=CARD):
+    """Готовая миниатюра или None; сама миниатюра здесь не строится."""
+    if not image:
+        return None
+    return ready_many([image], [geometry]).get((image.name, geometry))
+
+
+def ready_many(images, geometries=tuple(GEOMETRIES)):
+    """Готовые миниатюры всех размеров для многих картинок сразу.
+
+    Возвращает словарь {(имя картинки, geometry): Variant}.
+    """
+    names = {image.name for image in images if image}
+    found = {}
+    for name, variants in _load(names).items():
+        for geometry in geometries:
+            if geometry in variants:
+                found[(name, geometry)] = Variant(*variants[geometry])
+    return found
+
+
+def picture(image, found):
+    """src и srcset по форматам для <picture> или None, пока их строят.
+
+    found - словарь из ready_many.
+    """
+    fallback = found.get((image.name, CARD))
+    if fallback is None:
+        return None
+    srcsets = {}
+    for image_format in CARD_FORMATS:
+        variants = [
+            (found.get((image.name, f'card-{width}-{image_format}')), width)
+            for width in CARD_WIDTHS
+        ]
+        srcsets[image_format] = ', '.join(
+            f'{variant.url} {width}w'
+            for variant, width in variants if variant is not None
+        )
+    return {'src': fallback.url, **srcsets}
+
+
+def page_thumbnails(page):
+    """Миниатюры карточек страницы; ищутся, только если их выводят."""
+    return SimpleLazyObject(
+        lambda: ready_many(post.image for post in page)
+    )
+
+
+def generate(name):
+    """Строит миниатюры всех размеров; False, если не удалось.
+
+    Ошибки не выбрасываются, а пишутся в лог.
+    """
+    # Ключ исходника в sorl зависит от хранилища, оно должно совпадать с
+    # хранилищем поля Post.image
+    source = ImageFile(name, post_images)
+    variants = {}
+    try:
+        for geometry, (size, options) in GEOMETRIES.items():
+            thumbnail = get_thumbnail(source, size, **options)
+            variants[geometry] = [thumbnail.name, thumbnail.url,
+                                  thumbnail.width, thumbnail.height]
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+        return False
+    ImageVariants.objects.update_or_create(
+        name=name, defaults={'variants': json.dumps(variants)}
+    )
+    cache.delete(_key(name))
+    # Списки с заглушкой вместо картинки лежат в кэше, их нужно сбросить
+    for post in Post.objects.filter(image=name).only(
+        'author_id', 'group_id'
+    ):
+        caching.bump(*caching.post_scopes(post))
+    return True
+
+
+def forget(name):
+    """Забывает варианты удалённой картинки."""
+    ImageVariants.objects.filter(name=name).delete()
+    cache.delete(_key(name))
+
+
+def schedule(post):
+    """Ставит построение миниатюр картинки записи в очередь задач."""
+    if post.image:
+        enqueue('posts.generate_thumbnails', [post.image.name])
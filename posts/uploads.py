@@ -0,0 +1,107 @@
+"""Потоковая проверка загружаемых картинок до их декодирования.
+
+Декоратор image_uploads ставит ImageUploadHandler первым обработчиком
+загрузок только в представлениях с картинками записей; он пропускает
+куски файла дальше стандартным обработчикам, пока файл укладывается в
+POST_IMAGE_MAX_BYTES. По первым килобайтам Pillow читает только
+заголовок: формат и размеры проверяются до того, как кто-либо начнёт
+разжимать пиксели. Отвергнутый файл приходит в форму как RejectedUpload
+с текстом ошибки, остальное тело запроса дочитывается без сохранения.
+"""
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+# Сколько байт от начала файла отдаётся Pillow на разбор заголовка;
+# у JPEG перед размерами могут идти крупные блоки EXIF и ICC
+HEADER_BYTES = 256 * 1024
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, отвергнутый при загрузке; содержимого у него нет."""
+
+    def __init__(self, name, error):
+        super().__init__(BytesIO(), name=name, size=0)
+        self.error = error
+
+
+def check_header(head):
+    """Текст ошибки по заголовку картинки или None, если всё в порядке.
+
+    Возвращает '' если заголовок пока не удаётся разобрать.
+    """
+    try:
+        image = Image.open(BytesIO(head))
+    except Image.DecompressionBombError:
+        return 'Изображение слишком большое'
+    except Exception:
+        return ''
+    if image.format not in settings.POST_IMAGE_FORMATS:
+        return 'Неподдерживаемый формат изображения'
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        return 'Изображение слишком большое'
+    return None
+
+
+class ImageUploadHandler(FileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.head = b''
+        self.checked = False
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is not None:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            self.error = (
+                'Файл больше '
+                f'{filesizeformat(settings.POST_IMAGE_MAX_BYTES)}'
+            )
+            return None
+        if not self.checked:
+            self.head += raw_data[:HEADER_BYTES - len(self.head)]
+            self._check(final=len(self.head) >= HEADER_BYTES)
+            if self.error is not None:
+                return None
+        return raw_data
+
+    def _check(self, final):
+        error = check_header(self.head)
+        if error is None:
+            self.checked = True
+            self.head = b''
+        elif error or final:
+            self.error = error or 'Загрузите правильное изображение'
+
+    def file_complete(self, file_size):
+        if self.error is None and not self.checked:
+            self._check(final=True)
+        if self.error is not None:
+            return RejectedUpload(self.file_name, self.error)
+        return None
+
+
+def image_uploads(view):
+    """Проверяет загружаемые в представление картинки ImageUploadHandler.
+
+    Обработчики можно сменить только до чтения request.POST, а его читает
+    CsrfViewMiddleware, поэтому CSRF проверяется уже после подмены.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrapper
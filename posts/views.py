@@ -1,47 +1,77 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
+from . import export
+from .caching import (card_context, conditional, fragment_context,
+                      group_scopes, index_scopes, profile_scopes)
+from .counters import get_stats
+from .feeds import feed_sources
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post
+from .lookups import group_or_404, user_or_404
+from .models import Comment, Follow, Post
+from .paginators import paginate
+from .search import search_page
+from .thumbnails import page_thumbnails, schedule as schedule_thumbnails
+from .uploads import image_uploads
 
 
+@conditional(index_scopes)
 def index(request):
-    post_list = Post.objects.select_related('group')
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.for_listing()
+    page = paginate(request, post_list, 10, head='index')
     context = {
         'page': page,
-        'paginator': paginator,
+        'paginator': page.paginator,
+        'thumbnails': page_thumbnails(page),
+        **fragment_context(request, page, 'index'),
     }
     return render(request, 'index.html', context)
 
 
+@conditional(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = group_or_404(slug)
+    posts = Post.objects.for_listing().filter(group=group)
+    page = paginate(request, posts, 10, head=f'group:{group.pk}')
     context = {
         'group': group,
         'posts': posts,
         'page': page,
-        'paginator': paginator,
+        'paginator': page.paginator,
+        'thumbnails': page_thumbnails(page),
+        **fragment_context(request, page, f'group:{group.pk}'),
     }
     return render(request, 'group.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = search_page(query, 10, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page': page,
+        'paginator': page.paginator,
+        'thumbnails': page_thumbnails(page),
+        **card_context(),
+    }
+    return render(request, 'search.html', context)
+
+
+@image_uploads
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == 'POST' and form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        schedule_thumbnails(post)
         return redirect('index')
     return render(request, 'new_post.html', {'form': form})
 
@@ -49,27 +79,22 @@ def new_post(request):
 User = get_user_model()
 
 
+@conditional(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author)
-    post_count = post_list.count()
-    paginator = Paginator(post_list, 5)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    followers = Follow.objects.filter(
-        author__username=username
-    ).count()
-    followings = Follow.objects.filter(
-        user__username=username
-    ).count()
+    author = user_or_404(username)
+    post_list = Post.objects.for_listing().filter(author=author)
+    page = paginate(request, post_list, 5, head=f'profile:{author.pk}')
+    stats = get_stats(author)
     context = {
         'page': page,
         'author': author,
-        'paginator': paginator,
-        'post_count': post_count,
+        'paginator': page.paginator,
+        'thumbnails': page_thumbnails(page),
+        'post_count': stats.posts_count,
         'following': False,
-        'followers': followers,
-        'followings': followings,
+        'followers': stats.followers_count,
+        'followings': stats.followings_count,
+        **fragment_context(request, page, f'profile:{author.pk}', 'groups'),
     }
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -82,33 +107,32 @@ def profile(request, username):
     return render(request, 'profile.html', context)
 
 
+@conditional(profile_scopes)
 def post_view(request, username, post_id):
-    comments = Comment.objects.filter(post=post_id)
-    author = User.objects.get(username=username)
-    post = get_object_or_404(Post, id=post_id, author=author)
-    count = Post.objects.filter(author=author).select_related('author').count()
+    comments = Comment.objects.filter(post=post_id).select_related('author')
+    author = user_or_404(username)
+    post = get_object_or_404(
+        Post.objects.for_listing(), id=post_id, author=author
+    )
     form = CommentForm(request.POST or None)
-    followers = Follow.objects.filter(
-        author__username=username
-    ).count()
-    followings = Follow.objects.filter(
-        user__username=username
-    ).count()
+    stats = get_stats(author)
     context = {
         'post': post,
         'author': author,
-        'count': count,
+        'count': stats.posts_count,
         'form': form,
         'comments': comments,
-        'followers': followers,
-        'followings': followings,
+        'followers': stats.followers_count,
+        'followings': stats.followings_count,
+        **card_context(),
     }
     return render(request, 'post.html', context)
 
 
+@image_uploads
 @login_required
 def post_edit(request, username, post_id):
-    profile = get_object_or_404(User, username=username)
+    profile = user_or_404(username)
     post = get_object_or_404(Post, pk=post_id, author=profile)
     if request.user != profile:
         return redirect('post', username=username, post_id=post_id)
@@ -116,6 +140,8 @@ def post_edit(request, username, post_id):
                     files=request.FILES or None, instance=post)
     if request.method == 'POST' and form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect(
             'post',
             username=request.user.username,
@@ -128,6 +154,29 @@ def post_edit(request, username, post_id):
     )
 
 
+@login_required
+def export_posts(request, username):
+    """Выгрузка записей и комментариев автора; доступна ему самому."""
+    author = user_or_404(username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    file_format = request.GET.get('format', 'ndjson')
+    if file_format not in export.FORMATS:
+        raise Http404('Неизвестный формат выгрузки')
+    if request.GET.get('zip'):
+        content, extension = export.stream_zip(author, file_format), 'zip'
+    else:
+        content = export.stream(author, file_format)
+        extension = file_format
+    response = StreamingHttpResponse(
+        content, content_type=export.CONTENT_TYPES[extension]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.{extension}"'
+    )
+    return response
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -142,6 +191,7 @@ def server_error(request):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -156,22 +206,22 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    authors_list = Follow.objects.filter(user=request.user).values_list('author')
-    post_list = Post.objects.filter(author__in=authors_list)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list, pulled = feed_sources(request.user)
+    page = paginate(request, post_list, 10, pulled)
     context = {
         'page': page,
-        'paginator': paginator,
+        'paginator': page.paginator,
+        'thumbnails': page_thumbnails(page),
+        **card_context(),
     }
     return render(request, 'follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     user = request.user
-    author = get_object_or_404(User, username=username)
+    author = user_or_404(username)
     following = Follow.objects.filter(author=author, user=user).exists()
     if user != author and not following:
         follow = Follow.objects.create(
@@ -183,6 +233,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     unfollow = Follow.objects.select_related('user').filter(
             user=request.user,
@@ -0,0 +1,291 @@
+"""Кэш Django в файле SQLite, общий для всех процессов на одной машине.
+
+У LocMemCache в каждом воркере своя копия: попадания падают с ростом
+числа воркеров, а сброс поколения в одном воркере не виден остальным.
+Здесь данные лежат в файле в режиме WAL, отображённом в память:
+читатели не ждут писателя, а запись идёт короткими транзакциями.
+
+Целые числа хранятся как есть, поэтому incr - один атомарный UPDATE.
+Размер ограничен MAX_ENTRIES: сначала удаляются просроченные ключи,
+затем давно не читанные (приблизительный LRU).
+"""
+import math
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Ограничение SQLite на число параметров в одном запросе
+CHUNK_SIZE = 900
+# Время последнего чтения обновляется не чаще раза в столько секунд,
+# чтобы чтение почти никогда не превращалось в запись
+TOUCH_INTERVAL = 10
+# Сколько секунд запись ждёт занятый файл; отметка чтения ждёт недолго
+BUSY_TIMEOUT = 30
+TOUCH_BUSY_TIMEOUT = 0.05
+
+
+def _dumps(value):
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(value):
+    if isinstance(value, bytes):
+        return pickle.loads(value)
+    return value
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._mmap_size = int(options.get('MMAP_SIZE', 64 * 2 ** 20))
+        self._cull_every = max(1, min(32, self._max_entries // 10))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Соединение своё у каждого потока и у каждого процесса после fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(
+                self._path,
+                timeout=BUSY_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(f'PRAGMA mmap_size={self._mmap_size}')
+            # REPLACE удаляет старую строку; без этого триггер удаления
+            # на ней не срабатывает и счётчик строк уплывает
+            db.execute('PRAGMA recursive_triggers=ON')
+            db.execute('BEGIN IMMEDIATE')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL NOT NULL, accessed REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+            )
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)'
+            )
+            # Число строк ведут триггеры, чтобы _cull не считал их COUNT(*)
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache_size ('
+                'id INTEGER PRIMARY KEY CHECK (id = 0), '
+                'entries INTEGER NOT NULL)'
+            )
+            db.execute(
+                'INSERT OR IGNORE INTO cache_size '
+                'SELECT 0, COUNT(*) FROM cache'
+            )
+            db.execute(
+                'CREATE TRIGGER IF NOT EXISTS cache_inserted '
+                'AFTER INSERT ON cache BEGIN '
+                'UPDATE cache_size SET entries = entries + 1; END'
+            )
+            db.execute(
+                'CREATE TRIGGER IF NOT EXISTS cache_deleted '
+                'AFTER DELETE ON cache BEGIN '
+                'UPDATE cache_size SET entries = entries - 1; END'
+            )
+            db.execute('COMMIT')
+            local.db, local.pid, local.writes = db, os.getpid(), 0
+        return local.db
+
+    @contextmanager
+    def _write(self, writes=1):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        self._local.writes += writes
+        if self._local.writes >= self._cull_every:
+            self._local.writes = 0
+            self._cull()
+
+    def _cull(self):
+        with self._write(writes=0) as db:
+            db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            count = db.execute('SELECT entries FROM cache_size').fetchone()[0]
+            if count <= self._max_entries:
+                return
+            if self._cull_frequency == 0:
+                db.execute('DELETE FROM cache')
+                return
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (count - self._max_entries + count // self._cull_frequency,),
+            )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return math.inf if expires is None else expires
+
+    def _touch(self, keys, now):
+        # Если файл занят записью, LRU переживёт пропущенную отметку, а
+        # чтение не должно ни ждать писателя, ни падать из-за неё.
+        db = self._db
+        db.execute(f'PRAGMA busy_timeout={int(TOUCH_BUSY_TIMEOUT * 1000)}')
+        try:
+            db.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(now, key) for key in keys],
+            )
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            db.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}')
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._db.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or row[1] <= now:
+            return default
+        if row[2] < now - TOUCH_INTERVAL:
+            self._touch([key], now)
+        return _loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = {}
+        stale = []
+        now = time.time()
+        names = list(keys)
+        for start in range(0, len(names), CHUNK_SIZE):
+            chunk = names[start:start + CHUNK_SIZE]
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            )
+            for name, value, expires, accessed in rows:
+                if expires <= now:
+                    continue
+                if accessed < now - TOUCH_INTERVAL:
+                    stale.append(name)
+                found[keys[name]] = _loads(value)
+        if stale:
+            self._touch(stale, now)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                (key, _dumps(value), self._expires(timeout), time.time()),
+            )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        now = time.time()
+        rows = [
+            (self._key(key, version), _dumps(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._write(len(rows)) as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows
+            )
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            # Просроченный ключ считается отсутствующим и перезаписывается
+            cursor = db.execute(
+                'INSERT INTO cache VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                'expires = excluded.expires, accessed = excluded.accessed '
+                'WHERE cache.expires <= ?',
+                (key, _dumps(value), self._expires(timeout), now, now),
+            )
+            return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            cursor = db.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                "AND expires > ? AND typeof(value) = 'integer'",
+                (delta, key, now),
+            )
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                raise ValueError(f"Key '{key}' not found")
+            if cursor.rowcount:
+                return row[0]
+            # Не целое в столбце: делаем как BaseCache, через чтение
+            value = _loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (_dumps(value), key),
+            )
+            return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            cursor = db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND expires > ?',
+                (self._expires(timeout), key, time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND expires > ?',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write(writes=0) as db:
+            cursor = db.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        names = [self._key(key, version) for key in keys]
+        with self._write(writes=0) as db:
+            db.executemany(
+                'DELETE FROM cache WHERE key = ?', [(key,) for key in names]
+            )
+
+    def clear(self):
+        with self._write(writes=0) as db:
+            db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса; соединение с файлом
+        # дешевле держать открытым.
+        pass
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'users',
     'posts',
     'about',
+    'jobs',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -137,11 +138,95 @@ LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'index'
 LOGOUT_REDIRECT_URL = 'index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма из запроса только складываются в очередь исходящих, доставляет
+# их задача очереди через OUTBOX_DELIVERY_BACKEND пачками по
+# OUTBOX_BATCH_SIZE, делая не больше OUTBOX_MAX_ATTEMPTS попыток
+EMAIL_BACKEND = 'jobs.mail.OutboxBackend'
+OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Кэш общий для всех воркеров на машине и не требует отдельного сервера
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
+# Тесты работают с временной копией кэша и чистят её перед каждым тестом
+TEST_RUNNER = 'yatube.testing.Runner'
+
+# Длина материализованной ленты подписок одного пользователя
+FEED_MAX_LENGTH = 500
+# Записи авторов с таким числом подписчиков не раскладываются по лентам,
+# а подтягиваются при чтении; список таких авторов пересчитывается
+# задачей по расписанию раз в FEED_PULL_REFRESH секунд
+FEED_PULL_THRESHOLD = 10000
+FEED_PULL_REFRESH = 60 * 10
+
+# Фрагменты со списками записей сбрасываются сигналами моделей,
+# поэтому могут жить долго
+POSTS_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько первых id каждой ленты хранится в кэше и как долго
+POSTS_HEAD_LENGTH = 50
+POSTS_HEAD_TIMEOUT = 60 * 5
+
+# Защита от лавины пересчётов: замок пересчёта живёт не дольше
+# SINGLEFLIGHT_LOCK_TIMEOUT секунд, устаревшее значение отдаётся ещё
+# SINGLEFLIGHT_STALE_TTL секунд после срока, а без значения ждём его
+# не дольше SINGLEFLIGHT_WAIT секунд; BETA > 1 обновляет раньше
+SINGLEFLIGHT_LOCK_TIMEOUT = 30
+SINGLEFLIGHT_STALE_TTL = 60 * 5
+SINGLEFLIGHT_WAIT = 2
+SINGLEFLIGHT_BETA = 1.0
+
+# Группы и авторы по slug и username: сколько строк держит в памяти
+# каждый процесс и сколько секунд (даже если сброс потерялся), сколько
+# секунд они живут в общем кэше и как часто процесс проверяет журнал
+# сбросов от других процессов
+LOOKUPS_L1_SIZE = 1024
+LOOKUPS_L1_MAX_AGE = 60
+LOOKUPS_TIMEOUT = 60 * 5
+LOOKUPS_SYNC_INTERVAL = 1
+
+# Сколько секунд админка помнит число строк в списке
+ADMIN_COUNT_TIMEOUT = 60
+
+# Очередь фоновых задач (manage.py run_jobs): задача занята исполнителем
+# не дольше JOBS_LEASE секунд, свободный исполнитель проверяет очередь раз
+# в JOBS_POLL_INTERVAL секунд, повторы идут через JOBS_RETRY_DELAY,
+# удваиваясь до JOBS_RETRY_MAX_DELAY. С JOBS_EAGER задачи выполняются
+# в процессе веб-сервера сразу после фиксации транзакции
+JOBS_EAGER = False
+JOBS_LEASE = 60 * 5
+JOBS_POLL_INTERVAL = 1
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+# Периодические задачи: имя - задача и период в секундах
+JOBS_SCHEDULE = {
+    'refresh_feed_authors': {
+        'task': 'posts.refresh_feed_authors',
+        'every': FEED_PULL_REFRESH,
+    },
+    'send_outbox': {
+        'task': 'jobs.send_outbox',
+        'every': 60,
+    },
+    'reconcile_counters': {
+        'task': 'posts.reconcile_counters',
+        'every': 60 * 60 * 24,
+    },
+}
+
+# Загрузка картинок записей (posts.uploads.image_uploads): файл больше
+# POST_IMAGE_MAX_BYTES обрывается ещё при приёме, формат и число пикселей
+# проверяются по заголовку до декодирования, а оригинал больше
+# POST_IMAGE_MAX_SIDE по стороне уменьшается при сохранении
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 30000000
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
@@ -0,0 +1,63 @@
+"""Отдельный кэш для тестов и бенчмарков.
+
+Кэш из settings - общий файл разработчика, а тесты чистят его перед
+каждым тестом: откат тестовой базы переиспользует id, и закэшированные
+записи иначе достались бы следующему тесту. Поэтому тесты и бенчмарки
+работают с таким же SQLiteCache во временном каталоге.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def isolated_cache():
+    """Подменяет файлы кэшей на временные и удаляет их по выходе."""
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    caches = {
+        alias: {**options,
+                'LOCATION': os.path.join(directory, f'{alias}.sqlite3')}
+        for alias, options in settings.CACHES.items()
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def reset_cache():
+    from posts import lookups
+
+    cache.clear()
+    lookups.clear_local()
+
+
+class CacheResetMixin:
+    def startTest(self, test):
+        reset_cache()
+        super().startTest(test)
+
+
+class Runner(DiscoverRunner):
+    """DiscoverRunner с временным кэшем, пустым в начале каждого теста."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._isolated_cache = isolated_cache()
+        self._isolated_cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._isolated_cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        base = super().get_resultclass() or unittest.TextTestResult
+        return type('CacheResetResult', (CacheResetMixin, base), {})